@@ -0,0 +1,107 @@
+from operator import itemgetter
+from .columnar import ColumnStore
+from .utils import to_list
+
+
+SUM = "sum"
+COUNT = "count"
+MIN = "min"
+MAX = "max"
+MEAN = "mean"
+FIRST = "first"
+LAST = "last"
+AGGREGATES = (SUM, COUNT, MIN, MAX, MEAN, FIRST, LAST)
+ALL_ROWS = "*"
+
+
+def _update(func: str, state: dict, keys: list, values) -> None:
+    # None values are ignored like SQL aggregates, except for first / last
+    get = state.get
+    if func == SUM:
+        for key, value in zip(keys, values):
+            if value is not None:
+                state[key] = get(key, 0) + value
+    elif func == COUNT:
+        for key, value in zip(keys, values):
+            if value is not None:
+                state[key] = get(key, 0) + 1
+    elif func == MIN:
+        for key, value in zip(keys, values):
+            if value is not None:
+                current = get(key)
+                if current is None or value < current:
+                    state[key] = value
+    elif func == MAX:
+        for key, value in zip(keys, values):
+            if value is not None:
+                current = get(key)
+                if current is None or value > current:
+                    state[key] = value
+    elif func == MEAN:
+        for key, value in zip(keys, values):
+            if value is not None:
+                total, count = get(key, (0, 0))
+                state[key] = (total + value, count + 1)
+    elif func == FIRST:
+        for key, value in zip(keys, values):
+            if key not in state:
+                state[key] = value
+    elif func == LAST:
+        state.update(zip(keys, values))
+
+
+def _result(func: str, state: dict, key):
+    if func == COUNT:
+        return state.get(key, 0)
+    elif func == MEAN:
+        total, count = state.get(key, (0, 0))
+        return total / count if count else None
+    return state.get(key)
+
+
+class GroupBy:
+    dataset: object
+    index: list
+
+    def __init__(self, dataset, columns=None) -> None:
+        self.dataset = dataset
+        self.index = dataset.columns_index(columns) if columns else []
+
+    def specs(self, aggregates: dict) -> list:
+        # {"amount": ["sum", "mean"], "*": "count"} -> [(index, func, name), ...]
+        result = []
+        for column, funcs in aggregates.items():
+            for func in to_list(funcs):
+                func = func.lower()
+                if func not in AGGREGATES:
+                    raise ValueError(f"Unknown aggregate '{func}', expected one of {', '.join(AGGREGATES)}.")
+                if column == ALL_ROWS:
+                    if func != COUNT:
+                        raise ValueError(f"Column '{ALL_ROWS}' can be used only with '{COUNT}'.")
+                    result.append((None, func, func))
+                else:
+                    index = self.dataset.columns_index(column)[0]
+                    result.append((index, func, f"{self.dataset.columns[index]}_{func}"))
+        return result
+
+    def agg(self, aggregates: dict):
+        specs = self.specs(aggregates)
+        columns = [self.dataset.columns[idx] for idx in self.index] + [name for _, _, name in specs]
+        key_getter = (lambda row: ()) if not self.index else (itemgetter(*self.index) if len(self.index) > 1 else lambda row: (row[self.index[0]], ))
+        groups = {}
+        states = [{} for _ in specs]
+        # single pass over the batches, memory is bounded by the number of groups
+        for rows in self.dataset.batches():
+            keys = list(map(key_getter, rows))
+            groups.update(dict.fromkeys(keys))
+            for (index, func, _), state in zip(specs, states):
+                values = map(itemgetter(index), rows) if index is not None else [0] * len(rows)
+                _update(func, state, keys, values)
+        data = [[*key, *(_result(func, state, key) for (_, func, _), state in zip(specs, states))] for key in groups]
+        return type(self.dataset).from_store(ColumnStore.from_rows(data) if data else ColumnStore([[] for _ in columns]), columns)
+
+    def count(self):
+        return self.agg({ALL_ROWS: COUNT})
+
+    def __repr__(self) -> str:
+        return f"GroupBy object ({', '.join(self.dataset.columns[idx] for idx in self.index)})"
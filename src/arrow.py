@@ -0,0 +1,128 @@
+from array import array
+from collections.abc import Iterable, Iterator
+from .columnar import ColumnStore, INT64, FLOAT64, to_column
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+
+ARROW_TYPES = {INT64: "int64", FLOAT64: "float64"}
+
+
+def require_arrow() -> None:
+    if pa is None:
+        raise ImportError("pyarrow is required for Arrow, Parquet and Feather: pip install unidata[arrow]")
+
+
+def column_to_arrow(column: array|list):
+    if isinstance(column, array):
+        # typed columns copy their buffer to arrow, no python object per value,
+        # the exported table does not change with the dataset
+        arrow_type = getattr(pa, ARROW_TYPES[column.typecode])()
+        return pa.Array.from_buffers(arrow_type, len(column), [None, pa.py_buffer(column.tobytes())])
+    try:
+        return pa.array(column)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # mixed value types are kept as text
+        return pa.array([None if value is None else str(value) for value in column], pa.string())
+
+
+def column_from_arrow(chunked) -> array|list:
+    typecode = next((code for code, name in ARROW_TYPES.items() if chunked.type == getattr(pa, name)()), None)
+    if typecode and chunked.null_count == 0:
+        # buffer copy into a typed column, no python object per value
+        column = array(typecode)
+        for chunk in (chunk for chunk in chunked.chunks if len(chunk)):
+            width = chunk.type.bit_width // 8
+            column.frombytes(memoryview(chunk.buffers()[1])[chunk.offset * width:(chunk.offset + len(chunk)) * width])
+        return column
+    if pa.types.is_integer(chunked.type) and chunked.null_count == 0:
+        return column_from_arrow(chunked.cast(pa.int64()))
+    if pa.types.is_floating(chunked.type) and chunked.null_count == 0:
+        return column_from_arrow(chunked.cast(pa.float64()))
+    return to_column(chunked.to_pylist())
+
+
+def store_to_batch(store: ColumnStore, columns: list):
+    require_arrow()
+    return pa.RecordBatch.from_arrays([column_to_arrow(column) for column in store.columns], names=[str(column) for column in columns])
+
+
+def rows_to_batches(batches: Iterable[list], columns: list, schema=None) -> Iterator:
+    # row batches of a streamed dataset, later batches follow the first schema
+    for rows in batches:
+        batch = store_to_batch(ColumnStore.from_rows(rows), columns)
+        if schema is None:
+            schema = batch.schema
+        elif batch.schema != schema:
+            batch = pa.Table.from_batches([batch]).cast(schema).to_batches()[0]
+        yield batch
+
+
+def batches_to_table(batches: Iterable, columns: list):
+    require_arrow()
+    batches = list(batches)
+    if not batches:
+        return empty_schema(columns).empty_table()
+    return pa.Table.from_batches(batches)
+
+
+def arrow_to_store(data) -> tuple[ColumnStore, list]:
+    """ColumnStore and column names of a pyarrow Table, RecordBatch or iterable of RecordBatches."""
+    require_arrow()
+    if isinstance(data, pa.RecordBatch):
+        data = pa.Table.from_batches([data])
+    elif not isinstance(data, pa.Table):
+        data = pa.Table.from_batches(list(data))
+    return ColumnStore([column_from_arrow(column) for column in data.columns], data.num_rows), data.column_names
+
+
+def empty_schema(columns: list):
+    return pa.schema([(str(column), pa.null()) for column in columns])
+
+
+def write_parquet(file_name: str, batches: Iterator, compression: str="zstd", columns: list=None) -> str:
+    require_arrow()
+    writer = None
+    try:
+        for batch in batches:
+            if writer is None:
+                writer = pq.ParquetWriter(file_name, batch.schema, compression=compression)
+            writer.write_batch(batch)
+        if writer is None:
+            # no batches, an empty file with the columns
+            writer = pq.ParquetWriter(file_name, empty_schema(columns or []), compression=compression)
+    finally:
+        if writer is not None:
+            writer.close()
+    return file_name
+
+
+def read_parquet(file_name: str, columns: list=None, batch_size: int=None):
+    # the whole table, or an iterator of record batches with batch_size
+    require_arrow()
+    parquet_file = pq.ParquetFile(file_name)
+    if batch_size:
+        return parquet_file.iter_batches(batch_size=batch_size, columns=columns)
+    return parquet_file.read(columns=columns)
+
+
+def parquet_columns(file_name: str) -> list:
+    require_arrow()
+    return pq.ParquetFile(file_name).schema_arrow.names
+
+
+def write_feather(file_name: str, table, compression: str="zstd") -> str:
+    require_arrow()
+    feather.write_feather(table, file_name, compression=compression)
+    return file_name
+
+
+def read_feather(file_name: str, columns: list=None):
+    require_arrow()
+    # memory mapped, typed columns are read straight from the file buffers
+    return feather.read_table(file_name, columns=columns, memory_map=True)
@@ -0,0 +1,198 @@
+import asyncio
+from collections.abc import AsyncIterator, Iterable, Sequence
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
+from inspect import isawaitable
+from typing import Any, Self
+from . import constants as c
+from .bulk import iter_batches
+from .database import Database, connect_parameters
+from .utils import to_list, is_matrix
+
+
+ASYNC_WORKERS = 8
+# drivers with a native asyncio connection
+ASYNC_CONNECT = {
+    c.PSYCOPG: lambda library: library.AsyncConnection.connect,
+    c.ORACLEDB: lambda library: library.connect_async,
+}
+
+_executor: Executor = None
+
+
+def default_executor() -> Executor:
+    # shared by every blocking driver, bounds the threads used for database calls
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=ASYNC_WORKERS, thread_name_prefix="unidata-db")
+    return _executor
+
+
+async def resolve(value):
+    return await value if isawaitable(value) else value
+
+
+class AsyncDatabase:
+    """Database for asyncio code, same URL, params and SQL helpers as Database.
+
+    psycopg 3 and oracledb (thin mode) run on their native async connections,
+    other drivers run the blocking Database in a bounded thread pool.
+    The blocking API of Database is not inherited, only the attributes in
+    SPEC_ATTRIBUTES are read from a parsed, never connected Database.
+    """
+    SPEC_ATTRIBUTES = (
+        "url", "engine", "library", "library_name", "library_version", "host", "port", "user", "password",
+        "database", "kwargs", "placeholder", "params", "noname_fields", "bind_params",
+        "insert_sql", "update_sql", "delete_sql",
+    )
+    native: bool
+    executor: Executor
+
+    def __init__(self, url: str, executor: Executor=None) -> None:
+        # URL, params and SQL generation of Database, without its connection
+        self.spec = Database.__new__(Database)
+        self.spec.parse_url(url)
+        self.native = self.library_name in ASYNC_CONNECT
+        self.executor = executor or default_executor()
+        self._database: Database = None
+        self._connection = None
+        self._cursor = None
+        # one call at a time per connection
+        self._lock = asyncio.Lock()
+
+    def __getattr__(self, name: str):
+        if name in AsyncDatabase.SPEC_ATTRIBUTES:
+            return getattr(self.__dict__["spec"], name)
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            return await loop.run_in_executor(self.executor, partial(func, *args, **kwargs))
+
+    async def connect(self, params: dict=None) -> Self:
+        if not self.native:
+            self._database = await self._run(Database, self.url)
+            self._connection = self._database.connection
+            return self
+        params = self.params if params is None else params
+        connect_def = self.library.connect
+        params.update({k: v for k, v in self.kwargs.items() if k in connect_parameters(connect_def)})
+        self._connection = await ASYNC_CONNECT[self.library_name](self.library)(**params)
+        self._cursor = self._connection.cursor()
+        return self
+
+    async def reconnect(self) -> None:
+        await self.close()
+        await self.connect()
+
+    def connected(self) -> bool:
+        return self._connection is not None
+
+    @property
+    def cursor(self):
+        return self._database.cursor if self._database else self._cursor
+
+    @property
+    def description(self):
+        return self.cursor.description
+
+    @property
+    def fields(self) -> list:
+        return [item[0] for item in self.description]
+
+    async def close(self) -> None:
+        if self._database:
+            await self._run(self._database.close)
+            self._database = None
+        elif self._connection:
+            try:
+                await resolve(self._cursor.close())
+            finally:
+                await resolve(self._connection.close())
+        self._connection = self._cursor = None
+
+    async def commit(self) -> None:
+        if self._database:
+            await self._run(self._database.commit)
+        else:
+            await self._connection.commit()
+
+    async def rollback(self) -> None:
+        if self._database:
+            await self._run(self._database.rollback)
+        else:
+            await self._connection.rollback()
+
+    async def __aenter__(self) -> Self:
+        return self if self.connected() else await self.connect()
+
+    async def __aexit__(self, exc_type, exc_value, exc_traceback) -> None:
+        try:
+            await self.rollback()
+        finally:
+            await self.close()
+
+    async def execute(self, operation: Any, *args, **kwargs) -> Self:
+        if self._database:
+            await self._run(self._database.execute, operation, *args, **kwargs)
+        else:
+            async with self._lock:
+                await self._cursor.execute(operation, *args, **kwargs)
+        return self
+
+    async def executemany(self, operation: Any, seq_of_parameters: Sequence, *args, **kwargs) -> None:
+        if self._database:
+            await self._run(self._database.executemany, operation, seq_of_parameters, *args, **kwargs)
+        else:
+            async with self._lock:
+                await self._cursor.executemany(operation, seq_of_parameters, *args, **kwargs)
+
+    async def _fetch(self, method: str, *args):
+        if self._database:
+            return await self._run(getattr(self._database, method), *args)
+        async with self._lock:
+            return await getattr(self._cursor, method)(*args)
+
+    async def fetchone(self) -> Sequence[Any] | None:
+        return await self._fetch("fetchone")
+
+    async def fetchmany(self, size: int=0) -> Sequence[Sequence[Any]]:
+        return await self._fetch("fetchmany", size)
+
+    async def fetchall(self) -> Sequence[Sequence[Any]]:
+        return await self._fetch("fetchall")
+
+    async def iteritems(self, size: int=c.BATCH_SIZE) -> AsyncIterator[Sequence[Sequence[Any]]]:
+        while True:
+            rows = await self.fetchmany(size)
+            if not rows:
+                break
+            yield rows
+
+    async def run_sql(self, sql_text, data):
+        if self._database:
+            return await self._run(self._database.run_sql, sql_text, data)
+        if data and is_matrix(data):
+            return await self.executemany(sql_text, data)
+        return await self.execute(sql_text, data)
+
+    async def insert(self, table: str, data: list|Iterable, fields: str|list|tuple=None, batch_size: int=c.BATCH_SIZE) -> None:
+        fields = to_list(fields)
+        if self._database:
+            # blocking drivers keep their bulk-load path
+            await self._run(self._database.insert, table, data, fields, batch_size)
+        elif is_matrix(data) or not isinstance(data, Sequence):
+            for batch in iter_batches(data, batch_size):
+                await self.executemany(self.insert_sql(table, batch, fields), batch)
+        else:
+            await self.execute(self.insert_sql(table, data, fields), data)
+
+    async def update(self, table: str, data: list, fields: str|list|tuple, keys: str|list|tuple=None) -> None:
+        await self.run_sql(self.update_sql(table, to_list(fields), to_list(keys)), data)
+
+    async def delete(self, table: str, data: list=None, keys: str|list|tuple=None) -> None:
+        await self.run_sql(self.delete_sql(table, to_list(keys)), data)
+
+    def __repr__(self) -> str:
+        return f"AsyncDatabase ({self.engine}+{self.library_name}, {'native' if self.native else 'thread pool'})"
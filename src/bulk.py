@@ -0,0 +1,115 @@
+import csv
+from collections.abc import Callable, Iterable
+from io import StringIO
+from itertools import islice
+from . import constants as c
+
+
+# rows per INSERT statement built by PyMySQL executemany, bounded by max_allowed_packet
+# of the server (4MB on MySQL 5.7), PyMySQL's own default when it cannot be read
+MYSQL_MAX_STMT_LENGTH = 16 * 1024 * 1024
+MYSQL_DEFAULT_STMT_LENGTH = 1024000
+MYSQL_PACKET_MARGIN = 64 * 1024
+MYSQL_STMT_LENGTH: dict[str, int] = {}
+
+
+def iter_batches(rows: Iterable, size: int) -> Iterable[list]:
+    iterator = iter(rows)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def copy_sql(table: str, fields: list, csv_format: bool=False) -> str:
+    join_fields = f" ({', '.join(fields)})" if fields else ""
+    return f"COPY {table}{join_fields} FROM STDIN{' WITH (FORMAT csv)' if csv_format else ''}"
+
+
+def load_psycopg(database, table: str, fields: list, batch: list) -> None:
+    # COPY text format, values are adapted by psycopg
+    with database.cursor.copy(copy_sql(table, fields)) as copy:
+        for row in batch:
+            copy.write_row(row)
+
+
+def csv_value(value):
+    # bytea in hex format and booleans as t / f, other values as str() by the csv writer
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return "\\x" + bytes(value).hex()
+    if value is True or value is False:
+        return "t" if value else "f"
+    return value
+
+
+def load_psycopg2(database, table: str, fields: list, batch: list) -> None:
+    # COPY in csv format, None is the unquoted empty field
+    buffer = StringIO()
+    csv.writer(buffer, quoting=csv.QUOTE_NOTNULL, lineterminator="\n").writerows([list(map(csv_value, row)) for row in batch])
+    buffer.seek(0)
+    database.cursor.copy_expert(copy_sql(table, fields, csv_format=True), buffer)
+
+
+def load_oracledb(database, table: str, fields: list, batch: list) -> None:
+    # array binding, rejected rows are collected instead of aborting the batch
+    cursor = database.cursor
+    cursor.executemany(database.insert_sql(table, batch, fields), batch, batcherrors=True)
+    errors = cursor.getbatcherrors()
+    if errors:
+        raise Exception(f"{len(errors)} of {len(batch)} rows rejected, first at offset {errors[0].offset}: {errors[0].message}")
+
+
+def mysql_stmt_length(database) -> int:
+    # read once per server url
+    length = MYSQL_STMT_LENGTH.get(database.url)
+    if length is None:
+        try:
+            cursor = database.connection.cursor()
+            cursor.execute("SELECT @@max_allowed_packet")
+            packet = int(cursor.fetchone()[0])
+            cursor.close()
+            length = max(MYSQL_DEFAULT_STMT_LENGTH, min(MYSQL_MAX_STMT_LENGTH, packet - MYSQL_PACKET_MARGIN))
+        except Exception:
+            length = MYSQL_DEFAULT_STMT_LENGTH
+        length = MYSQL_STMT_LENGTH[database.url] = length
+    return length
+
+
+def load_pymysql(database, table: str, fields: list, batch: list) -> None:
+    # PyMySQL rewrites INSERT ... VALUES executemany into multi-row VALUES statements
+    cursor = database.cursor
+    cursor.max_stmt_length = mysql_stmt_length(database)
+    cursor.executemany(database.insert_sql(table, batch, fields), batch)
+
+
+def load_pymssql(database, table: str, fields: list, batch: list) -> None:
+    database.cursor.executemany(database.insert_sql(table, batch, fields), batch, batch_size=len(batch))
+
+
+def load_executemany(database, table: str, fields: list, batch: list) -> None:
+    database.executemany(database.insert_sql(table, batch, fields), batch)
+
+
+LOADERS: dict[str, Callable] = {
+    c.PSYCOPG: load_psycopg,
+    c.PSYCOPG2: load_psycopg2,
+    c.ORACLEDB: load_oracledb,
+    c.PYMYSQL: load_pymysql,
+    c.PYMSSQL: load_pymssql,
+    c.PYODBC: load_executemany,
+    c.SQLITE3: load_executemany,
+}
+
+
+def bulk_load(database, table: str, rows: Iterable, fields: list=None, batch_size: int=c.BATCH_SIZE, commit: bool=False) -> int:
+    """Load rows from any iterable with the fastest path of the driver.
+
+    Rows are consumed in batches of batch_size, with commit=True every batch
+    is a separate transaction. Returns the number of loaded rows.
+    """
+    loader = LOADERS.get(database.library_name, load_executemany)
+    count = 0
+    for batch in iter_batches(rows, batch_size):
+        loader(database, table, fields, batch)
+        count += len(batch)
+        if commit:
+            database.commit()
+    return count
@@ -0,0 +1,99 @@
+from time import monotonic
+from . import constants as c
+
+
+class SchemaCatalog:
+    """Cached tables, views, columns and indexes of a Database.
+
+    Every part is loaded with one metadata query and kept for ttl seconds,
+    invalidate() drops the cache after DDL.
+    """
+    ttl: float
+
+    def __init__(self, database, ttl: float=c.CATALOG_TTL) -> None:
+        self.database = database
+        self.ttl = ttl
+        self._cache: dict = {}
+
+    def _query(self, kind: str) -> list:
+        sql = c.METADATA[kind, self.database.engine]
+        if self.database.engine == c.ACCESS or sql in (c.NOT_IMPLEMENTED, c.NOT_POSSIBLE_SQL):
+            return []
+        cursor = self.database.connection.cursor()
+        try:
+            cursor.execute(sql)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def _get(self, kind: str, build):
+        cached = self._cache.get(kind)
+        if cached is None or monotonic() - cached[0] > self.ttl:
+            cached = self._cache[kind] = (monotonic(), build(self._query(kind)))
+        return cached[1]
+
+    def invalidate(self, kind: str=None) -> None:
+        if kind:
+            self._cache.pop(kind, None)
+        else:
+            self._cache.clear()
+
+    @property
+    def tables(self) -> tuple:
+        return self._get(c.TABLES, lambda rows: tuple(item[0] for item in rows))
+
+    @property
+    def views(self) -> dict:
+        return self._get(c.VIEWS, lambda rows: {
+            item[0]: {
+                'sql_text': str(item[1]),
+                'check_option': item[2],
+                'is_updatable': item[3],
+                'is_insertable': item[4],
+                'is_deletable': item[5],
+            } for item in rows
+        })
+
+    @property
+    def columns(self) -> dict:
+        # {object_name: {column_name: {...}}} for all tables and views
+        def build(rows):
+            result = {}
+            for item in rows:
+                result.setdefault(item[0], {})[item[2]] = {
+                    'id': item[1],
+                    'type': item[3],
+                    'is_nullable': item[4],
+                    'default_value': item[5],
+                    'comment': str(item[6]),
+                }
+            return result
+        return self._get(c.ALL_COL, build)
+
+    @property
+    def indexes(self) -> dict:
+        # {table_name: {index_name: {'unique': ..., 'columns': [(column_name, descend), ...]}}}
+        def build(rows):
+            result = {}
+            for table, index, unique, _, column, descend in rows:
+                index_info = result.setdefault(table, {}).setdefault(index, {'unique': unique, 'columns': []})
+                index_info['columns'].append((column, descend))
+            return result
+        return self._get(c.ALL_INDEX_COL, build)
+
+    @staticmethod
+    def _lookup(objects: dict, name: str) -> dict:
+        # exact name first, then case insensitive (Oracle upper case, PostgreSQL lower case)
+        if name in objects:
+            return objects[name]
+        lowered = name.lower()
+        return next((value for key, value in objects.items() if key.lower() == lowered), {})
+
+    def object_columns(self, name: str) -> dict:
+        return self._lookup(self.columns, name)
+
+    def table_indexes(self, table: str) -> dict:
+        return self._lookup(self.indexes, table)
+
+    def __repr__(self) -> str:
+        return f"SchemaCatalog ({self.database.engine}, cached: {', '.join(self._cache) or 'nothing'})"
@@ -0,0 +1,382 @@
+from array import array
+from collections.abc import Callable, Iterable, Iterator, Sequence, MutableSequence
+from itertools import zip_longest
+from typing import Any, Self
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# typed columns: homogeneous int / float values are kept in compact arrays
+INT64 = "q"
+FLOAT64 = "d"
+TYPECODES = {int: INT64, float: FLOAT64}
+NUMPY_DTYPES = {INT64: "int64", FLOAT64: "float64"}
+
+
+def column_kind(values: Sequence) -> str|None:
+    if not values:
+        return None
+    kind = type(values[0])
+    if kind not in TYPECODES or not all(type(value) is kind for value in values):
+        return None
+    return TYPECODES[kind]
+
+
+def to_column(values: Iterable) -> array|list:
+    values = values if isinstance(values, (list, tuple)) else list(values)
+    typecode = column_kind(values)
+    if typecode:
+        try:
+            return array(typecode, values)
+        except OverflowError:
+            pass
+    return list(values)
+
+
+def fits(column: array|list, value: Any) -> bool:
+    return not isinstance(column, array) or type(value) is (int if column.typecode == INT64 else float)
+
+
+def numpy_view(column: array|list):
+    # zero-copy view of a typed column, None without numpy or for object columns
+    if np is None or not isinstance(column, array):
+        return None
+    return np.frombuffer(column, dtype=NUMPY_DTYPES[column.typecode]) if column else np.empty(0, NUMPY_DTYPES[column.typecode])
+
+
+class ColumnStore:
+    columns: list
+    length: int
+
+    def __init__(self, columns: list=None, length: int=None) -> None:
+        self.columns = columns or []
+        self.length = length if length is not None else (len(self.columns[0]) if self.columns else 0)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable) -> Self:
+        rows = rows if isinstance(rows, (list, tuple)) else list(rows)
+        # ragged rows are padded with None
+        return cls([to_column(values) for values in zip_longest(*rows)], len(rows))
+
+    @classmethod
+    def from_batches(cls, batches: Iterable[Sequence], width: int=None, typed: bool=True) -> Self:
+        # accumulate per column and type the columns once at the end, typed=False keeps lists
+        columns = [[] for _ in range(width or 0)]
+        length = 0
+        for rows in batches:
+            if not rows:
+                continue
+            i = -1
+            for i, values in enumerate(zip_longest(*rows)):
+                if i == len(columns):
+                    columns.append([None] * length)
+                columns[i].extend(values)
+            for column in columns[i + 1:]:
+                column.extend([None] * len(rows))
+            length += len(rows)
+        return cls([to_column(values) for values in columns] if typed else columns, length)
+
+    @property
+    def width(self) -> int:
+        return len(self.columns)
+
+    def copy(self) -> Self:
+        return ColumnStore([column[:] for column in self.columns], self.length)
+
+    def select(self, indexes: Sequence[int]) -> Self:
+        return ColumnStore([self.columns[idx][:] for idx in indexes], self.length)
+
+    def slice(self, start: int, stop: int) -> Self:
+        return ColumnStore([column[start:stop] for column in self.columns], len(range(start, min(stop, self.length))))
+
+    def take(self, positions: Sequence[int|None], indexes: Sequence[int]=None) -> Self:
+        # None positions (outer joins) become None values
+        outer = None in positions
+        columns = []
+        for column in (self.columns if indexes is None else [self.columns[idx] for idx in indexes]):
+            if outer:
+                columns.append(to_column([None if i is None else column[i] for i in positions]))
+            else:
+                values = [column[i] for i in positions]
+                columns.append(array(column.typecode, values) if isinstance(column, array) else values)
+        return ColumnStore(columns, len(positions))
+
+    def values(self, index: int) -> list:
+        column = self.columns[index]
+        return column.tolist() if isinstance(column, array) else list(column)
+
+    def numpy(self, index: int):
+        return numpy_view(self.columns[index])
+
+    def get(self, column: int, row: int) -> Any:
+        return self.columns[column][row]
+
+    def set(self, column: int, row: int, value: Any) -> None:
+        if not fits(self.columns[column], value):
+            self.columns[column] = self.columns[column].tolist()
+        self.columns[column][row] = value
+
+    def set_column(self, index: int, values: Iterable) -> None:
+        self.columns[index] = to_column(values)
+
+    def insert_column(self, index: int, values: Iterable) -> None:
+        self.columns.insert(index, to_column(values))
+
+    def append_column(self, values: Iterable) -> None:
+        self.columns.append(to_column(values))
+        if len(self.columns) == 1:
+            self.length = len(self.columns[0])
+
+    def pop_column(self, index: int) -> array|list:
+        return self.columns.pop(index)
+
+    def extend_column(self, index: int, values: Sequence) -> None:
+        column = self.columns[index]
+        if isinstance(column, array) and not all(fits(column, value) for value in values):
+            self.columns[index] = column.tolist()
+        self._extend(index, values)
+
+    def _extend(self, index: int, values: Sequence) -> None:
+        try:
+            self.columns[index].extend(values)
+        except BufferError:
+            # the buffer is shared (numpy / arrow), the store continues on a copy
+            column = self.columns[index] = array(self.columns[index].typecode, self.columns[index])
+            column.extend(values)
+
+    def append(self, row: Sequence) -> None:
+        self.extend([row])
+
+    def extend(self, rows: Iterable[Sequence]) -> None:
+        rows = rows if isinstance(rows, (list, tuple)) else list(rows)
+        if not rows:
+            return
+        # ragged rows are padded with None, wider rows add None filled columns
+        i = -1
+        for i, values in enumerate(zip_longest(*rows)):
+            if i == self.width:
+                self.columns.append([None] * self.length)
+            self.extend_column(i, values)
+        for idx in range(i + 1, self.width):
+            self.extend_column(idx, [None] * len(rows))
+        self.length += len(rows)
+
+    def widen(self, width: int) -> None:
+        # None filled columns up to width
+        for _ in range(self.width, width):
+            self.columns.append([None] * self.length)
+
+    def set_row(self, index: int, row: Sequence) -> None:
+        self.widen(len(row))
+        for column, value in zip_longest(range(self.width), row):
+            self.set(column, index, value)
+
+    def insert(self, index: int, row: Sequence) -> None:
+        # list.insert semantics for the position, narrower rows are padded with None
+        index = max(0, min(self.length, index + self.length if index < 0 else index))
+        self.widen(len(row))
+        for column, value in zip_longest(range(self.width), row):
+            if not fits(self.columns[column], value):
+                self.columns[column] = self.columns[column].tolist()
+            self.columns[column].insert(index, value)
+        self.length += 1
+
+    def delete(self, item) -> None:
+        # IndexError like a list, before any column changes
+        rows = range(self.length)[item]
+        count = len(rows) if isinstance(item, slice) else 1
+        for column in self.columns:
+            del column[item]
+        self.length -= count
+
+    def reorder(self, positions: Sequence[int]) -> None:
+        self.columns = self.take(positions).columns
+
+    def extend_store(self, store: Self) -> None:
+        if not self.columns:
+            self.columns = [[None] * self.length for _ in range(store.width)]
+        for i, column in enumerate(store.columns):
+            if isinstance(column, array) and isinstance(self.columns[i], array) and column.typecode == self.columns[i].typecode:
+                self._extend(i, column)
+            else:
+                self.extend_column(i, column)
+        self.length += store.length
+
+    def row(self, index: int) -> tuple:
+        return tuple(column[index] for column in self.columns)
+
+    def rows(self, start: int=0, stop: int=None) -> Iterator[tuple]:
+        if not self.columns:
+            return iter([()] * len(range(start, self.length if stop is None else min(stop, self.length))))
+        if start == 0 and stop is None:
+            return zip(*self.columns)
+        return zip(*(column[start:stop] for column in self.columns))
+
+    def batches(self, size: int) -> Iterator[list]:
+        for start in range(0, self.length, size):
+            yield list(self.rows(start, start + size))
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __repr__(self) -> str:
+        return f"ColumnStore ({self.length} rows, {self.width} columns)"
+
+
+class Row(MutableSequence):
+    """Write-through view of a single row of a ColumnStore.
+
+    A row has one value per column: values are set in place, a value inserted
+    or appended adds a None filled column to the whole store, deleting a value
+    raises as a single row cannot be shorter than the others.
+    """
+    __slots__ = ("store", "index", "on_widen")
+
+    def __init__(self, store: ColumnStore, index: int, on_widen: Callable=None) -> None:
+        self.store = store
+        self.index = index
+        self.on_widen = on_widen
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [column[self.index] for column in self.store.columns[item]]
+        return self.store.columns[item][self.index]
+
+    def __setitem__(self, item, value) -> None:
+        if isinstance(item, slice):
+            for idx, val in zip(range(*item.indices(self.store.width)), value, strict=True):
+                self.store.set(idx, self.index, val)
+        else:
+            self.store.set(item if item >= 0 else item + self.store.width, self.index, value)
+
+    def __delitem__(self, item) -> None:
+        raise TypeError("A Dataset row has one value per column, remove the column from the Dataset instead.")
+
+    def insert(self, index: int, value) -> None:
+        values = list(self)
+        values.insert(index, value)
+        self.store.set_row(self.index, values)
+        if self.on_widen:
+            self.on_widen(self.store.width)
+
+    def __len__(self) -> int:
+        return self.store.width
+
+    def __iter__(self) -> Iterator:
+        return (column[self.index] for column in self.store.columns)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Sequence) and not isinstance(other, str) and list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+class Rows(MutableSequence):
+    """Row oriented view of a ColumnStore with the list API, rows are created on demand.
+
+    An index gives a write-through Row, a slice gives a copy (a list of lists),
+    writes to its rows do not reach the store. Row views keep their position,
+    they follow the data at that position after rows are inserted or deleted.
+    Rows wider than the store add None filled columns and call on_widen(width).
+    """
+    __slots__ = ("store", "on_widen")
+
+    def __init__(self, store: ColumnStore, on_widen: Callable=None) -> None:
+        self.store = store
+        self.on_widen = on_widen
+
+    def widened(self, width: int) -> None:
+        if self.on_widen and self.store.width > width:
+            self.on_widen(self.store.width)
+
+    def position(self, item: int) -> int:
+        if item < 0:
+            item += self.store.length
+        if not 0 <= item < self.store.length:
+            raise IndexError("row index out of range")
+        return item
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            start, stop, step = item.indices(self.store.length)
+            if step == 1:
+                return [list(row) for row in self.store.rows(start, stop)]
+            return [list(self.store.row(i)) for i in range(start, stop, step)]
+        return Row(self.store, self.position(item), self.on_widen)
+
+    def __setitem__(self, item, value) -> None:
+        width = self.store.width
+        if isinstance(item, slice):
+            rows = list(value)
+            start, stop, step = item.indices(self.store.length)
+            if step == 1:
+                # list semantics, the slice can be replaced by more or fewer rows
+                self.store.delete(slice(start, max(start, stop)))
+                for offset, row in enumerate(rows):
+                    self.store.insert(start + offset, row)
+            else:
+                positions = range(start, stop, step)
+                if len(positions) != len(rows):
+                    raise ValueError(f"attempt to assign sequence of size {len(rows)} to extended slice of size {len(positions)}")
+                for position, row in zip(positions, rows):
+                    self.store.set_row(position, row)
+        else:
+            self.store.set_row(self.position(item), value)
+        self.widened(width)
+
+    def __delitem__(self, item) -> None:
+        self.store.delete(item if isinstance(item, slice) else self.position(item))
+
+    def insert(self, index: int, row: Sequence) -> None:
+        width = self.store.width
+        self.store.insert(index, row)
+        self.widened(width)
+
+    def __len__(self) -> int:
+        return self.store.length
+
+    def __iter__(self) -> Iterator[Row]:
+        return (Row(self.store, i, self.on_widen) for i in range(self.store.length))
+
+    def append(self, row: Sequence) -> None:
+        self.extend([row])
+
+    def extend(self, rows: Iterable[Sequence]) -> None:
+        width = self.store.width
+        self.store.extend(rows)
+        self.widened(width)
+
+    def pop(self, index: int=-1) -> list:
+        row = list(self[index])
+        del self[index]
+        return row
+
+    def clear(self) -> None:
+        self.store.delete(slice(None))
+
+    def reverse(self) -> None:
+        self.store.reorder(range(self.store.length - 1, -1, -1))
+
+    def sort(self, key: Callable=None, reverse: bool=False) -> None:
+        # stable like list.sort, the rows are compared as lists
+        rows = self[:]
+        self.store.reorder(sorted(range(len(rows)), key=(lambda i: key(rows[i])) if key else rows.__getitem__, reverse=reverse))
+
+    def copy(self) -> list:
+        return self[:]
+
+    def __add__(self, other) -> list:
+        return self[:] + list(other)
+
+    def __radd__(self, other) -> list:
+        return list(other) + self[:]
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Sequence) and len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self) -> str:
+        return f"Rows ({self.store.length} rows)"
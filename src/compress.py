@@ -0,0 +1,106 @@
+import io
+import shlex
+import zlib
+from .utils import file_extension
+from .constants import COMPRESS_MIN_SIZE, COMPRESS_CHUNK_SIZE, COMPRESS_LEVEL, COMPRESSED_EXTENSIONS
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# ?compress= of a Folder / SSH url: paramiko transport compression or per file streams
+TRANSPORT = "ssh"
+GZIP = "gzip"
+ZSTD = "zstd"
+METHODS = {
+    "1": TRANSPORT, "true": TRANSPORT, "yes": TRANSPORT, TRANSPORT: TRANSPORT, "transport": TRANSPORT, "zlib": TRANSPORT,
+    GZIP: GZIP, "gz": GZIP,
+    ZSTD: ZSTD, "zst": ZSTD,
+}
+# remote commands reading / writing the compressed stream
+COMPRESS_COMMAND = {GZIP: "gzip -c {}", ZSTD: "zstd -qc {}"}
+DECOMPRESS_COMMAND = {GZIP: "gzip -dc > {0}.part && mv {0}.part {0}", ZSTD: "zstd -dqc > {0}.part && mv {0}.part {0}"}
+
+
+def compression(value: str) -> str|None:
+    if not value or value.lower() in ("0", "false", "no"):
+        return None
+    method = METHODS.get(value.lower())
+    if method is None:
+        raise ValueError(f"Unknown compression '{value}', expected one of {', '.join(sorted(set(METHODS.values())))}.")
+    if method == ZSTD and zstandard is None:
+        raise ImportError("zstandard is required for zstd compression: pip install unidata[zstd]")
+    return method
+
+
+def should_compress(file_name: str, size: int) -> bool:
+    # small files gain nothing, compressed formats do not shrink again
+    return size >= COMPRESS_MIN_SIZE and file_extension(file_name) not in COMPRESSED_EXTENSIONS
+
+
+def compressor(method: str):
+    if method == ZSTD:
+        return zstandard.ZstdCompressor(level=COMPRESS_LEVEL[ZSTD]).compressobj()
+    return zlib.compressobj(COMPRESS_LEVEL[GZIP], zlib.DEFLATED, 31)
+
+
+def decompressor(method: str):
+    if method == ZSTD:
+        return zstandard.ZstdDecompressor().decompressobj()
+    return zlib.decompressobj(31)
+
+
+def check_exit(stdout, stderr, path: str) -> None:
+    if stdout.channel.recv_exit_status() != 0:
+        raise IOError(f"Compressed transfer of {path} failed: {stderr.read().decode(errors='replace').strip()}")
+
+
+class RemoteReader(io.RawIOBase):
+    """Decompressed content of a remote file, compressed on the remote host."""
+
+    def __init__(self, ssh, method: str, path: str) -> None:
+        self.path = path
+        _, self.stdout, self.stderr = ssh.exec_command(COMPRESS_COMMAND[method].format(shlex.quote(path)))
+        self.decompressor = decompressor(method)
+        self.pending = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self.pending:
+            chunk = self.stdout.read(COMPRESS_CHUNK_SIZE)
+            if not chunk:
+                check_exit(self.stdout, self.stderr, self.path)
+                return 0
+            self.pending = memoryview(self.decompressor.decompress(chunk))
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+    def close(self) -> None:
+        if not self.closed:
+            self.stdout.channel.close()
+        super().close()
+
+
+def put_compressed(ssh, method: str, local_file: str, remote_path: str) -> None:
+    # compressed while read, decompressed by the remote host into a temp file
+    stdin, stdout, stderr = ssh.exec_command(DECOMPRESS_COMMAND[method].format(shlex.quote(remote_path)))
+    stream = compressor(method)
+    with open(local_file, "rb") as fl:
+        while chunk := fl.read(COMPRESS_CHUNK_SIZE):
+            if data := stream.compress(chunk):
+                stdin.write(data)
+    stdin.write(stream.flush())
+    stdin.flush()
+    stdin.channel.shutdown_write()
+    check_exit(stdout, stderr, remote_path)
+
+
+def get_compressed(ssh, method: str, remote_path: str, local_file: str) -> None:
+    with RemoteReader(ssh, method, remote_path) as reader, open(local_file, "wb") as fl:
+        while chunk := reader.read(COMPRESS_CHUNK_SIZE):
+            fl.write(chunk)
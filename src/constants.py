@@ -1,6 +1,59 @@
 _sql = lambda sql: "\n".join(line.strip() for line in sql.splitlines())
 
 XLSX_MAX_ROWS = 1048576
+XLSX_WIDTH_SAMPLE_ROWS = 1000
+BATCH_SIZE = 100000
+# ADAPTIVE FETCH SIZE: MEMORY TARGET PER BATCH AND FETCH LATENCY BOUNDS.
+FETCH_TARGET_BYTES = 64 * 1024 * 1024
+FETCH_MIN_ROWS = 100
+FETCH_MAX_ROWS = 1000000
+FETCH_PREFETCH_ROWS = 1000
+FETCH_MIN_SECONDS = 0.05
+FETCH_MAX_SECONDS = 2.0
+FETCH_SAMPLE_ROWS = 100
+# estimated python object size of a fetched row and value
+FETCH_ROW_OVERHEAD = 56
+FETCH_VALUE_OVERHEAD = 40
+FETCH_COLUMN_BYTES = 32
+FETCH_MAX_COLUMN_BYTES = 4000
+# generated INSERT / UPDATE / DELETE statements kept by Database
+SQL_CACHE_SIZE = 1024
+# oracledb statement cache per connection
+STATEMENT_CACHE_SIZE = 100
+# default number of slices of a partitioned extract
+PARTITIONS = 8
+# batches buffered per running slice of a partitioned extract
+PARTITION_QUEUE_SIZE = 4
+# partition by physical row address (Oracle ROWID, PostgreSQL ctid)
+ROWID = "rowid"
+# upserts of more rows (or of iterators) go through a staged temp table
+UPSERT_STAGE_ROWS = 10000
+# content hash of synced files and the read size while hashing
+SYNC_HASH = "md5"
+SYNC_CHUNK_SIZE = 1024 * 1024
+# parallel FolderSync transfers: workers with own SFTP channels, retries per file
+SYNC_WORKERS = 8
+SYNC_RETRIES = 2
+SYNC_RETRY_DELAY = 1.0
+# synced files recorded in a FolderSync manifest per commit
+MANIFEST_COMMIT_ROWS = 1000
+# every n-th manifest run lists all directories, for files rewritten in place
+MANIFEST_RESCAN_RUNS = 10
+# delta transfer: block size bounds, read size and largest literal sent at once
+DELTA_MIN_SIZE = 1024 * 1024
+DELTA_MIN_BLOCK = 2048
+DELTA_MAX_BLOCK = 128 * 1024
+DELTA_READ_SIZE = 1024 * 1024
+DELTA_MAX_LITERAL = 1024 * 1024
+# streaming compression of SFTP transfers, decided per file by size and extension
+COMPRESS_MIN_SIZE = 64 * 1024
+COMPRESS_CHUNK_SIZE = 1024 * 1024
+COMPRESS_LEVEL = {"gzip": 6, "zstd": 3}
+COMPRESSED_EXTENSIONS = {
+    "gz", "tgz", "zip", "bz2", "xz", "zst", "7z", "rar", "lz4",
+    "jpg", "jpeg", "png", "gif", "webp", "mp3", "mp4", "mkv", "avi",
+    "xlsx", "docx", "pptx", "pdf", "parquet", "feather",
+}
 
 # SUPPORTED DATABASE TYPES.
 ACCESS = "access"
@@ -100,6 +153,10 @@ SPLCALL = {
     SQLITE3: CALL_SPL,
 }
 
+INSERT = "INSERT"
+UPDATE = "UPDATE"
+DELETE = "DELETE"
+
 TRUNCATE_SQL = "TRUNCATE TABLE {}"
 DELETE_SQL = "DELETE FROM {}"
 
@@ -111,6 +168,49 @@ TRUNCATE_TABLE = {
   SQLITE: DELETE_SQL,
 }
 
+# CONNECTION POOL URL PARAMETERS, NOT PASSED TO connect().
+POOL = "pool"
+POOL_MIN = "pool_min"
+POOL_MAX = "pool_max"
+POOL_IDLE = "pool_idle"
+POOL_TIMEOUT = "pool_timeout"
+POOL_CHECK = "pool_check"
+POOL_PARAMS = (POOL, POOL_MIN, POOL_MAX, POOL_IDLE, POOL_TIMEOUT, POOL_CHECK)
+
+# HEALTH CHECK QUERIES FOR POOLED CONNECTIONS.
+PING_SQL = {
+  ORACLE: "SELECT 1 FROM dual",
+  POSTGRESQL: "SELECT 1",
+  MSSQL: "SELECT 1",
+  MYSQL: "SELECT 1",
+  SQLITE: "SELECT 1",
+}
+
+# STAGING TABLES FOR SET-BASED UPSERT: {0} STAGE, {1} TARGET TABLE, {2} FIELDS.
+STAGE_NAME = {
+  ORACLE: "ORA$PTT_{}",
+  MSSQL: "#{}",
+}
+
+STAGE_TABLE = {
+  ORACLE: "CREATE PRIVATE TEMPORARY TABLE {0} ON COMMIT PRESERVE DEFINITION AS SELECT {2} FROM {1} WHERE 1=0",
+  POSTGRESQL: "CREATE TEMPORARY TABLE {0} AS SELECT {2} FROM {1} WHERE 1=0",
+  MSSQL: "SELECT {2} INTO {0} FROM {1} WHERE 1=0",
+  MYSQL: "CREATE TEMPORARY TABLE {0} AS SELECT {2} FROM {1} WHERE 1=0",
+  SQLITE: "CREATE TEMPORARY TABLE {0} AS SELECT {2} FROM {1} WHERE 1=0",
+}
+
+# ON CONFLICT / MERGE fail on duplicate keys in the staged rows
+MERGE_UNIQUE_SOURCE = (POSTGRESQL, ORACLE, MSSQL)
+
+DROP_STAGE = {
+  ORACLE: "DROP TABLE {}",
+  POSTGRESQL: "DROP TABLE {}",
+  MSSQL: "DROP TABLE {}",
+  MYSQL: "DROP TEMPORARY TABLE {}",
+  SQLITE: "DROP TABLE {}",
+}
+
 NOT_IMPLEMENTED = "FINDING YOUR {} NOT IMPLEMENTED FOR {}."
 NOT_POSSIBLE_SQL = "SQL CANNOT READ THE SCHEMA IN {} THROUGH {}."
 
@@ -121,6 +221,11 @@ VIEWS = "VIEWS"
 VIEW_COL = "VIEW COLUMNS"
 INDEXES = "INDEXES"
 INDEX_COL = "INDEX COLUMNS"
+ALL_COL = "ALL COLUMNS"
+ALL_INDEX_COL = "ALL INDEX COLUMNS"
+
+# SCHEMA CATALOG CACHE IN SECONDS.
+CATALOG_TTL = 300
 
 METADATA = dict()
 
@@ -228,21 +333,9 @@ METADATA[VIEWS, MSSQL] = _sql(
 """
 )
 
-# QUERIES FOR FINDING TABLE COLUMNS.
-METADATA[TAB_COL, ACCESS] = NOT_POSSIBLE_SQL
-METADATA[TAB_COL, MYSQL] = _sql(
+# DATA TYPE EXPRESSIONS SHARED BY THE COLUMN QUERIES.
+DATA_TYPE_ORACLE = _sql(
     """
-    SELECT ordinal_position AS column_id, column_name,
-    column_type AS data_type, is_nullable as nullable,
-    column_default AS default_value, column_comment AS comments
-    FROM INFORMATION_SCHEMA.COLUMNS
-    WHERE table_name = '{}'
-    AND table_schema = database()
-"""
-)
-METADATA[TAB_COL, ORACLE] = _sql(
-    """
-    SELECT column_id, c.column_name,
       CASE
         WHEN (data_type LIKE '%CHAR%' OR data_type IN ('RAW','UROWID'))
           THEN data_type||'('||c.char_length||
@@ -262,20 +355,11 @@ METADATA[TAB_COL, ORACLE] = _sql(
           THEN data_type||'('||to_char(data_precision)||')'||DECODE(
               data_precision, 126,' (double precision)', 63,' (real)','')
         ELSE data_type
-        END AS data_type,
-      DECODE(nullable,'Y','Yes','No') AS nullable,
-      data_default AS default_value,
-      comments
-    FROM user_tab_cols c, user_col_comments com
-    WHERE c.table_name = '{}'
-    AND c.table_name = com.table_name
-    AND c.column_name = com.column_name
-    ORDER BY column_id
+        END
 """
-)
-METADATA[TAB_COL, POSTGRESQL] = _sql(
+).strip()
+DATA_TYPE_POSTGRESQL = _sql(
     """
-    SELECT ordinal_position AS column_id, column_name,
       CASE
         WHEN data_type = 'character varying'
           THEN 'varchar('||character_maximum_length||')'
@@ -298,12 +382,64 @@ METADATA[TAB_COL, POSTGRESQL] = _sql(
           THEN REGEXP_REPLACE(data_type, '^time',
               'time('||datetime_precision||')')
         ELSE data_type
-        END AS data_type,
+        END
+"""
+).strip()
+DATA_TYPE_MSSQL = _sql(
+    """
+      CASE
+        WHEN t.name in ('char','varchar')
+          THEN CONCAT(t.name,'(',c.max_length,')')
+        WHEN t.name in ('nchar','nvarchar')
+          THEN CONCAT(t.name,'(',c.max_length/2,')')
+        WHEN t.name in ('numeric','decimal')
+          THEN CONCAT(t.name,'(',c.precision,',',c.scale,')')
+        WHEN t.name in ('real','float')
+          THEN CONCAT(t.name,'(',c.precision,')')
+        WHEN t.name LIKE '%INT'
+          THEN t.name
+        WHEN t.name IN ('money','datetime')
+          THEN t.name
+        ELSE t.name
+        END
+"""
+).strip()
+
+# QUERIES FOR FINDING TABLE COLUMNS.
+METADATA[TAB_COL, ACCESS] = NOT_POSSIBLE_SQL
+METADATA[TAB_COL, MYSQL] = _sql(
+    """
+    SELECT ordinal_position AS column_id, column_name,
+    column_type AS data_type, is_nullable as nullable,
+    column_default AS default_value, column_comment AS comments
+    FROM INFORMATION_SCHEMA.COLUMNS
+    WHERE table_name = '{}'
+    AND table_schema = database()
+"""
+)
+METADATA[TAB_COL, ORACLE] = _sql(
+    f"""
+    SELECT column_id, c.column_name,
+      {DATA_TYPE_ORACLE} AS data_type,
+      DECODE(nullable,'Y','Yes','No') AS nullable,
+      data_default AS default_value,
+      comments
+    FROM user_tab_cols c, user_col_comments com
+    WHERE c.table_name = '{{}}'
+    AND c.table_name = com.table_name
+    AND c.column_name = com.column_name
+    ORDER BY column_id
+"""
+)
+METADATA[TAB_COL, POSTGRESQL] = _sql(
+    f"""
+    SELECT ordinal_position AS column_id, column_name,
+      {DATA_TYPE_POSTGRESQL} AS data_type,
       is_nullable AS nullable,
       column_default AS default_value,
       '' AS comments
     FROM INFORMATION_SCHEMA.COLUMNS
-    WHERE table_name = lower('{}')
+    WHERE table_name = lower('{{}}')
     AND table_schema = 'public'
 """
 )
@@ -324,23 +460,9 @@ METADATA[TAB_COL, SQLITE] = _sql(
 
 # Used for both METADATA[TAB_COL, MSSQL] and METADATA[VIEW_COL, MSSQL].
 TAB_COL_MSSQL = _sql(
-    """
+    f"""
     SELECT c.column_id, c.name AS column_name,
-      CASE
-        WHEN t.name in ('char','varchar')
-          THEN CONCAT(t.name,'(',c.max_length,')')
-        WHEN t.name in ('nchar','nvarchar')
-          THEN CONCAT(t.name,'(',c.max_length/2,')')
-        WHEN t.name in ('numeric','decimal')
-          THEN CONCAT(t.name,'(',c.precision,',',c.scale,')')
-        WHEN t.name in ('real','float')
-          THEN CONCAT(t.name,'(',c.precision,')')
-        WHEN t.name LIKE '%INT'
-          THEN t.name
-        WHEN t.name IN ('money','datetime')
-          THEN t.name
-        ELSE t.name
-        END AS data_type,
+      {DATA_TYPE_MSSQL} AS data_type,
       CASE
         WHEN c.is_nullable = 0
           THEN 'NOT NULL'
@@ -357,8 +479,8 @@ TAB_COL_MSSQL = _sql(
       ON o.object_id = c.object_id
     LEFT JOIN sys.types t
       ON t.user_type_id = c.user_type_id
-    WHERE o.type = '{}'
-    AND o.name = '{}'
+    WHERE o.type = '{{}}'
+    AND o.name = '{{}}'
     ORDER BY c.column_id
 """
 )
@@ -437,3 +559,179 @@ METADATA[INDEX_COL, SQLITE] = _sql(
 """
 )
 METADATA[INDEX_COL, MSSQL] = NOT_IMPLEMENTED
+
+# QUERIES FOR FINDING COLUMNS OF ALL TABLES AND VIEWS AT ONCE.
+METADATA[ALL_COL, ACCESS] = NOT_POSSIBLE_SQL
+METADATA[ALL_COL, MYSQL] = _sql(
+    """
+    SELECT table_name AS object_name, ordinal_position AS column_id, column_name,
+    column_type AS data_type, is_nullable as nullable,
+    column_default AS default_value, column_comment AS comments
+    FROM INFORMATION_SCHEMA.COLUMNS
+    WHERE table_schema = database()
+    ORDER BY table_name, ordinal_position
+"""
+)
+METADATA[ALL_COL, ORACLE] = _sql(
+    f"""
+    SELECT c.table_name AS object_name, column_id, c.column_name,
+      {DATA_TYPE_ORACLE} AS data_type,
+      DECODE(nullable,'Y','Yes','No') AS nullable,
+      data_default AS default_value,
+      comments
+    FROM user_tab_cols c, user_col_comments com
+    WHERE c.table_name = com.table_name
+    AND c.column_name = com.column_name
+    ORDER BY c.table_name, column_id
+"""
+)
+METADATA[ALL_COL, POSTGRESQL] = _sql(
+    f"""
+    SELECT table_name AS object_name, ordinal_position AS column_id, column_name,
+      {DATA_TYPE_POSTGRESQL} AS data_type,
+      is_nullable AS nullable,
+      column_default AS default_value,
+      '' AS comments
+    FROM INFORMATION_SCHEMA.COLUMNS
+    WHERE table_schema = 'public'
+    ORDER BY table_name, ordinal_position
+"""
+)
+METADATA[ALL_COL, SQLITE] = _sql(
+    """
+    SELECT m.name AS object_name, p.cid AS column_id, p.name AS column_name, p.type AS data_type,
+      CASE
+        WHEN p.\"notnull\" = 1
+          THEN 'No'
+        ELSE 'Yes'
+        END AS nullable,
+      p.dflt_value AS default_value,
+      '' AS comments
+    FROM sqlite_master m, pragma_table_info(m.name) p
+    WHERE m.type IN ('table', 'view')
+    AND m.name NOT LIKE 'sqlite_%'
+    ORDER BY m.name, p.cid
+"""
+)
+METADATA[ALL_COL, MSSQL] = _sql(
+    f"""
+    SELECT o.name AS object_name, c.column_id, c.name AS column_name,
+      {DATA_TYPE_MSSQL} AS data_type,
+      CASE
+        WHEN c.is_nullable = 0
+          THEN 'NOT NULL'
+        ELSE ''
+        END AS nullable,
+      '' AS default_value,
+      '' AS comments
+    FROM sys.columns c INNER JOIN sys.objects o
+      ON o.object_id = c.object_id
+    LEFT JOIN sys.types t
+      ON t.user_type_id = c.user_type_id
+    WHERE o.type IN ('U', 'V')
+    ORDER BY o.name, c.column_id
+"""
+)
+
+# QUERIES FOR FINDING INDEX COLUMNS OF ALL TABLES AT ONCE.
+METADATA[ALL_INDEX_COL, ACCESS] = NOT_POSSIBLE_SQL
+METADATA[ALL_INDEX_COL, MYSQL] = _sql(
+    """
+    SELECT table_name, index_name,
+      CASE
+        WHEN non_unique = 0
+          THEN 'Yes'
+        ELSE 'No'
+        END AS \"unique\",
+      seq_in_index AS column_position, column_name,
+      CASE
+        WHEN collation = 'D'
+          THEN 'DESC'
+        ELSE 'ASC'
+        END AS descend
+    FROM INFORMATION_SCHEMA.STATISTICS
+    WHERE table_schema = database()
+    ORDER BY table_name, index_name, seq_in_index
+"""
+)
+METADATA[ALL_INDEX_COL, ORACLE] = _sql(
+    """
+    SELECT i.table_name, i.index_name,
+      CASE
+        WHEN i.uniqueness = 'UNIQUE'
+          THEN 'Yes'
+        ELSE 'No'
+        END AS \"unique\",
+      ic.column_position, ic.column_name, ic.descend
+    FROM user_indexes i INNER JOIN user_ind_columns ic
+      ON ic.index_name = i.index_name
+    ORDER BY i.table_name, i.index_name, ic.column_position
+"""
+)
+METADATA[ALL_INDEX_COL, POSTGRESQL] = _sql(
+    """
+    SELECT t.relname AS table_name, i.relname AS index_name,
+      CASE
+        WHEN ix.indisunique
+          THEN 'Yes'
+        ELSE 'No'
+        END AS \"unique\",
+      k.position AS column_position, a.attname AS column_name,
+      CASE
+        WHEN ix.indoption[k.position - 1] & 1 = 1
+          THEN 'DESC'
+        ELSE 'ASC'
+        END AS descend
+    FROM pg_index ix
+    INNER JOIN pg_class t ON t.oid = ix.indrelid
+    INNER JOIN pg_class i ON i.oid = ix.indexrelid
+    INNER JOIN pg_namespace n ON n.oid = t.relnamespace
+    CROSS JOIN LATERAL unnest(ix.indkey) WITH ORDINALITY AS k(attnum, position)
+    LEFT JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = k.attnum
+    WHERE n.nspname = 'public'
+    ORDER BY t.relname, i.relname, k.position
+"""
+)
+METADATA[ALL_INDEX_COL, SQLITE] = _sql(
+    """
+    SELECT m.name AS table_name, il.name AS index_name,
+      CASE
+        WHEN il.\"unique\" = 1
+          THEN 'Yes'
+        ELSE 'No'
+        END AS \"unique\",
+      ix.seqno AS column_position, ix.name AS column_name,
+      CASE
+        WHEN ix.desc = 1
+          THEN 'DESC'
+        ELSE 'ASC'
+        END AS descend
+    FROM sqlite_master m, pragma_index_list(m.name) il, pragma_index_xinfo(il.name) ix
+    WHERE m.type = 'table'
+    AND ix.key = 1
+    ORDER BY m.name, il.name, ix.seqno
+"""
+)
+METADATA[ALL_INDEX_COL, MSSQL] = _sql(
+    """
+    SELECT t.name AS table_name, i.name AS index_name,
+      CASE
+        WHEN i.is_unique = 1
+          THEN 'Yes'
+        ELSE 'No'
+        END AS \"unique\",
+      ic.key_ordinal AS column_position, c.name AS column_name,
+      CASE
+        WHEN ic.is_descending_key = 1
+          THEN 'DESC'
+        ELSE 'ASC'
+        END AS descend
+    FROM sys.indexes i
+    INNER JOIN sys.tables t ON t.object_id = i.object_id
+    INNER JOIN sys.index_columns ic ON ic.object_id = i.object_id AND ic.index_id = i.index_id
+    INNER JOIN sys.columns c ON c.object_id = ic.object_id AND c.column_id = ic.column_id
+    WHERE i.name IS NOT NULL
+    AND ic.key_ordinal > 0
+    ORDER BY t.name, i.name, ic.key_ordinal
+"""
+)
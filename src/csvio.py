@@ -0,0 +1,153 @@
+import os
+import csv
+import weakref
+from collections.abc import Callable, Iterable, Iterator
+from io import BufferedReader, TextIOWrapper
+from itertools import islice
+from .ssh import SSH
+from .utils import close_all
+from .compress import TRANSPORT, RemoteReader, should_compress
+from .constants import BATCH_SIZE
+
+
+def parser(to_type: Callable) -> Callable:
+    # empty strings become None, values that do not parse are kept as text
+    def parse(value: str):
+        if value == "":
+            return None
+        try:
+            return to_type(value)
+        except (TypeError, ValueError):
+            return value
+    return parse
+
+
+def infer_type(values: Iterable[str]) -> Callable|None:
+    values = [value for value in values if value != ""]
+    if not values:
+        return None
+    for to_type in (int, float):
+        try:
+            for value in values:
+                to_type(value)
+            return to_type
+        except ValueError:
+            continue
+    return None
+
+
+def parse_column(values: tuple, to_type: Callable) -> list:
+    try:
+        return list(map(to_type, values))
+    except (TypeError, ValueError):
+        return list(map(parser(to_type), values))
+
+
+def open_text(file_name: str, mode: str="r", encoding: str="utf-8", ssh=None) -> TextIOWrapper:
+    if ssh:
+        path = os.path.join(ssh.path, file_name)
+        if "r" in mode and ssh.compress not in (None, TRANSPORT) and should_compress(path, ssh.sftp.stat(path).st_size):
+            # compressed on the remote host, decompressed while read
+            return TextIOWrapper(BufferedReader(RemoteReader(ssh.ssh, ssh.compress, path)), encoding=encoding, newline="")
+        sftp_file = ssh.sftp.file(path, mode + "b")
+        if "r" in mode:
+            sftp_file.prefetch()
+        else:
+            sftp_file.set_pipelined(True)
+        return TextIOWrapper(sftp_file, encoding=encoding, newline="")
+    return open(file_name, mode=mode, newline="", encoding=encoding)
+
+
+class CSVReader:
+    columns: list
+    types: list
+
+    def __init__(
+        self,
+        file_name: str,
+        delimiter: str=",",
+        quotechar: str='"',
+        quoting=csv.QUOTE_MINIMAL,
+        column_index: int|bool=1,
+        encoding: str="utf-8",
+        ssh=None,
+        batch_size: int=BATCH_SIZE,
+        types: bool|list|dict=None,
+    ) -> None:
+        self.ssh = SSH(ssh) if isinstance(ssh, str) else ssh
+        self.is_ssh_url = isinstance(ssh, str)
+        self.batch_size = batch_size
+        try:
+            self.file = open_text(file_name, "r", encoding, self.ssh)
+        except Exception:
+            close_all(self.ssh if self.is_ssh_url else None)
+            raise
+        # a reader that is never iterated to the end closes its file once collected
+        self.finalizer = weakref.finalize(self, close_all, self.file, self.ssh if self.is_ssh_url else None)
+        self.reader = csv.reader(self.file, delimiter=delimiter, quotechar=quotechar, quoting=quoting)
+        self.columns = []
+        try:
+            if column_index:
+                # rows before the header are skipped
+                for _ in range(int(column_index)):
+                    self.columns = next(self.reader, [])
+        except Exception:
+            self.close()
+            raise
+        self.types = types
+
+    def column_types(self, rows: list) -> list:
+        if self.types is True:
+            return [infer_type(values) for values in zip(*rows)]
+        elif isinstance(self.types, dict):
+            lowered = {str(k).lower(): v for k, v in self.types.items()}
+            return [lowered.get(str(column).lower()) for column in self.columns]
+        return list(self.types or [])
+
+    def __iter__(self) -> Iterator[list]:
+        try:
+            parsers = None
+            while True:
+                rows = list(islice(self.reader, self.batch_size))
+                if not rows:
+                    break
+                if self.types:
+                    if parsers is None:
+                        parsers = self.column_types(rows)
+                    columns = list(zip(*rows))
+                    for i, to_type in enumerate(parsers[:len(columns)]):
+                        if to_type:
+                            columns[i] = parse_column(columns[i], to_type)
+                    rows = list(zip(*columns))
+                yield rows
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        self.finalizer()
+
+
+def write_csv(
+    file_name: str,
+    rows: Iterable,
+    columns: list=None,
+    delimiter: str=",",
+    quotechar: str='"',
+    quoting=csv.QUOTE_MINIMAL,
+    header: bool=True,
+    encoding: str="utf-8",
+    ssh=None,
+) -> str:
+    is_ssh_url = isinstance(ssh, str)
+    if is_ssh_url:
+        ssh = SSH(ssh)
+    try:
+        with open_text(file_name, "w", encoding, ssh) as csv_file:
+            csv_writer = csv.writer(csv_file, delimiter=delimiter, quotechar=quotechar, quoting=quoting, lineterminator="\n")
+            if header and columns:
+                csv_writer.writerow(columns)
+            csv_writer.writerows(rows)
+    finally:
+        if is_ssh_url:
+            ssh.close()
+    return file_name
@@ -1,10 +1,65 @@
-from collections.abc import Sequence
+from collections.abc import Iterable, Iterator, Sequence
 import constants as c
 from .dbapi2 import DBConnection
+from .bulk import bulk_load
+from .catalog import SchemaCatalog
 from importlib import import_module
+from functools import lru_cache
+from operator import itemgetter
 from inspect import signature
+from uuid import uuid4
 from urllib.parse import ParseResult, urlsplit, parse_qsl
-from .utils import to_list, is_matrix
+from .utils import to_list, is_matrix, iter_lowered
+
+
+@lru_cache
+def connect_parameters(connect_def) -> frozenset:
+    return frozenset(signature(connect_def).parameters) - set(c.POOL_PARAMS)
+
+
+def bind_params(placeholder: str, fields: str|Sequence, delim: str=",", operator: str=None) -> str:
+    delim = delim.strip().upper()
+    delim = f"{'' if delim=="," else ' '}{delim} "
+    operator = ("{}"+operator).format if operator else "".format
+    return delim.join([f"{operator(field)}{placeholder.format(field)}" for field in to_list(fields)])
+
+
+@lru_cache(maxsize=c.SQL_CACHE_SIZE)
+def generate_sql(statement: str, table: str, fields: tuple, keys: tuple, engine: str, placeholder: str, width: int=0) -> str:
+    # the same text for the same statement, drivers can reuse the prepared statement
+    if statement == c.INSERT:
+        join_fields = f" ({', '.join(fields)})" if fields else ""
+        return f"INSERT INTO {table}{join_fields} VALUES ({bind_params(placeholder, fields or Database.noname_fields([None] * width))})"
+    condition = f"WHERE {bind_params(placeholder, keys, delim="AND", operator="=")}" if keys else ""
+    if statement == c.UPDATE:
+        return f'UPDATE {table} SET {bind_params(placeholder, fields, delim=",", operator="=")} {condition}'
+    return f'DELETE FROM {table} {condition}' if keys else c.TRUNCATE_TABLE[engine].format(table)
+
+
+@lru_cache(maxsize=c.SQL_CACHE_SIZE)
+def upsert_sql(table: str, fields: tuple, keys: tuple, engine: str, placeholder: str, source: str=None) -> str:
+    # rows come from bind parameters, or from the source (staging) table
+    lowered_keys = [key.lower() for key in keys]
+    updates = [field for field in fields if field.lower() not in lowered_keys]
+    join_fields = ", ".join(fields)
+    if engine in (c.MYSQL, c.POSTGRESQL, c.SQLITE):
+        values = f"SELECT {join_fields} FROM {source}" if source else f"VALUES ({bind_params(placeholder, fields)})"
+        if engine == c.MYSQL:
+            update = ", ".join(f"{field}=VALUES({field})" for field in updates or keys[:1])
+            return f"INSERT INTO {table} ({join_fields}) {values} ON DUPLICATE KEY UPDATE {update}"
+        # WHERE avoids the ON CONFLICT / join ambiguity of INSERT ... SELECT in SQLite
+        where = " WHERE 1=1" if source else ""
+        update = f"UPDATE SET {', '.join(f'{field}=excluded.{field}' for field in updates)}" if updates else "NOTHING"
+        return f"INSERT INTO {table} ({join_fields}) {values}{where} ON CONFLICT ({', '.join(keys)}) DO {update}"
+    if engine in (c.ORACLE, c.MSSQL):
+        if not source:
+            dual = " FROM dual" if engine == c.ORACLE else ""
+            source = f"(SELECT {', '.join(f'{placeholder.format(field)} AS {field}' for field in fields)}{dual})"
+        condition = " AND ".join(f"d.{key} = s.{key}" for key in keys)
+        matched = f" WHEN MATCHED THEN UPDATE SET {', '.join(f'd.{field} = s.{field}' for field in updates)}" if updates else ""
+        inserted = f" WHEN NOT MATCHED THEN INSERT ({join_fields}) VALUES ({', '.join(f's.{field}' for field in fields)})"
+        return f"MERGE INTO {table} d USING {source} s ON ({condition}){matched}{inserted}{';' if engine == c.MSSQL else ''}"
+    raise Exception(f"Upsert is not supported for {engine.upper()}.")
 
 
 class Database(DBConnection):
@@ -19,8 +74,18 @@ class Database(DBConnection):
     database: str
     kwargs: dict
     placeholder: str
+    pool: object = None
+    _params: dict = None
+    _catalog: SchemaCatalog = None
 
     def __init__(self, url: str) -> None:
+        self.parse_url(url)
+        # oracledb init_oracle_client by default
+        if self.library_name == c.ORACLEDB and self.library.is_thin_mode():
+            self.library.init_oracle_client(lib_dir=self.kwargs.get("lib_dir", None))
+        self.connect(self.params)
+
+    def parse_url(self, url: str) -> None:
         self.url = url
         url: ParseResult = urlsplit(url)
         if not (url.scheme and url.netloc):
@@ -52,17 +117,29 @@ class Database(DBConnection):
         # self.placeholder = c.PARAMSTYLE["nobindvars"] if self.engine == c.ACCESS else c.PARAMSTYLE.get(self.library.paramstyle)
         self.placeholder = c.PARAMSTYLE.get(self.library_name, c.NOBINDVARS)
         # self.placeholder = c.PARAMSTYLE.get(self.library.paramstyle, c.PLACEHOLDER.get(self.library_name, c.NOBINDVARS))
-        # oracledb init_oracle_client by default
-        if self.library_name == c.ORACLEDB and self.library.is_thin_mode():
-            self.library.init_oracle_client(lib_dir=self.kwargs.get("lib_dir", None))
-        self.connect(self.params)
 
     def connect(self, params: dict) -> None:
         connect_def = self.library.connect
         # filter arguments there are in connect() function
-        params.update({k: v for k, v in self.kwargs.items() if k in signature(connect_def).parameters})
+        params.update({k: v for k, v in self.kwargs.items() if k in connect_parameters(connect_def)})
         self.connection = connect_def(**params)
 
+    def close(self) -> None:
+        # pooled connections go back to their pool instead of closing
+        if self.pool:
+            self.pool.release(self)
+        else:
+            super().close()
+
+    def server_cursor(self):
+        # rows stay on the server and are sent per fetch, instead of the whole result on execute
+        if self.library_name in (c.PSYCOPG, c.PSYCOPG2):
+            return self.connection.cursor(name=f"unidata_{uuid4().hex}")
+        elif self.library_name == c.PYMYSQL:
+            return self.connection.cursor(self.library.cursors.SSCursor)
+        # oracledb, pyodbc, pymssql and sqlite3 cursors already fetch from the server in batches
+        return self.connection.cursor()
+
     def reconnect(self) -> None:
         self.connection = None
         self.connect(self.params)
@@ -72,10 +149,15 @@ class Database(DBConnection):
 
     @property
     def params(self) -> dict:
+        # resolved once, pooled copies reconnect without the driver lookup
+        if self._params is not None:
+            return dict(self._params)
         attr: tuple = ("host", "database", "user", "password", "port")
         params: dict = {param: getattr(self, param) for param in attr if getattr(self, param, None)}
         if self.library_name == c.ORACLEDB:
             params["service_name"] = params.pop("database")
+            if "stmtcachesize" not in self.kwargs:
+                params["stmtcachesize"] = c.STATEMENT_CACHE_SIZE
         elif self.library_name in (c.PSYCOPG, c.PSYCOPG2):
             params["dbname"] = params.pop("database")
         elif self.library_name == c.PYMSSQL:
@@ -96,7 +178,8 @@ class Database(DBConnection):
                 params["DBQ"] = params.pop("database")
         elif self.library_name == c.SQLITE3:
             pass
-        return params
+        self._params = params
+        return dict(params)
 
     @property
     def fields(self):
@@ -108,33 +191,78 @@ class Database(DBConnection):
         return [i if numeric else f"Col{i}" for i in range(1, len_data + 1)]
     
     def bind_params(self, fields: str|Sequence, delim: str=",", operator: str=None) -> str:
-        delim = delim.strip().upper()
-        delim = f"{'' if delim=="," else ' '}{delim} "
-        operator = ("{}"+operator).format if operator else "".format
-        return delim.join([f"{operator(field)}{self.placeholder.format(field)}" for field in to_list(fields)])
+        return bind_params(self.placeholder, fields, delim, operator)
     
     def run_sql(self, sql_text, data):
         kwargs = {}
         if is_matrix(data) and self.library_name == c.PYMSSQL:
             kwargs = {'batch_size': len(data)} 
+        elif data and not is_matrix(data) and self.library_name == c.PSYCOPG:
+            # server-side prepared statement, reused for the same sql text
+            kwargs = {'prepare': True}
         return (self.executemany if data and is_matrix(data) else self.execute)(sql_text, data, **kwargs)
     
-    def insert(self, table: str, data: list, fields: str|list|tuple = None) -> None:
+    def insert_sql(self, table: str, data: list, fields: list) -> str:
+        width = 0 if fields else len(self.noname_fields(data))
+        return generate_sql(c.INSERT, table, tuple(fields), (), self.engine, self.placeholder, width)
+
+    def update_sql(self, table: str, fields: list, keys: list) -> str:
+        return generate_sql(c.UPDATE, table, tuple(fields), tuple(keys), self.engine, self.placeholder)
+
+    def delete_sql(self, table: str, keys: list) -> str:
+        return generate_sql(c.DELETE, table, (), tuple(keys), self.engine, self.placeholder)
+
+    def insert(self, table: str, data: list|Iterable, fields: str|list|tuple = None, batch_size: int=c.BATCH_SIZE) -> None:
         fields = to_list(fields)
-        join_fields = f" ({', '.join(fields)})" if fields else ""
-        sql_text = f"INSERT INTO {table}{join_fields} VALUES ({self.bind_params(fields or self.noname_fields(data))})"
-        self.run_sql(sql_text, data)
+        if is_matrix(data) or isinstance(data, Iterator):
+            self.bulk_insert(table, data, fields, batch_size)
+            return
+        self.run_sql(self.insert_sql(table, data, fields), data)
     
+    def bulk_insert(self, table: str, rows: Iterable, fields: str|list|tuple=None, batch_size: int=c.BATCH_SIZE, commit: bool=False) -> int:
+        return bulk_load(self, table, rows, to_list(fields), batch_size, commit)
+
     def update(self, table: str, data: list, fields: str|list|tuple, keys: str|list|tuple=None) -> None:
-        fields = to_list(fields)
-        condition = f"WHERE {self.bind_params(to_list(keys), delim="AND", operator="=")}" if keys else ""
-        sql_text = f'UPDATE {table} SET {self.bind_params(fields, delim=",", operator="=")} {condition}'
-        self.run_sql(sql_text, data)
+        self.run_sql(self.update_sql(table, to_list(fields), to_list(keys)), data)
 
     def delete(self, table: str, data: list=None, keys: str|list|tuple=None) -> None:
-        condition = f"WHERE {self.bind_params(to_list(keys), delim="AND", operator="=")}" if keys else ""
-        sql_text = f'DELETE FROM {table} {condition}' if keys else c.TRUNCATE_TABLE[self.engine].format(table)
-        self.run_sql(sql_text, data)
+        self.run_sql(self.delete_sql(table, to_list(keys)), data)
+
+    def upsert(
+        self,
+        table: str,
+        data: list|Iterable,
+        fields: str|list|tuple,
+        keys: str|list|tuple,
+        batch_size: int=c.BATCH_SIZE,
+        stage_rows: int=c.UPSERT_STAGE_ROWS,
+    ) -> int:
+        fields, keys = to_list(fields), to_list(keys)
+        missing = set(iter_lowered(keys)) - set(iter_lowered(fields))
+        if not keys or missing:
+            raise ValueError(f"Upsert keys must be in fields: {', '.join(missing) or 'no keys'}.")
+        if data and not is_matrix(data) and not isinstance(data, Iterator):
+            data = [data]
+        if isinstance(data, Sequence) and len(data) < stage_rows:
+            # native single statement, executed once per batch
+            if data:
+                self.run_sql(upsert_sql(table, tuple(fields), tuple(keys), self.engine, self.placeholder), data)
+            return len(data)
+        # large batches: bulk-load a staging table, then one set-based merge,
+        # the per call suffix keeps concurrent upserts of a table apart
+        stage = c.STAGE_NAME.get(self.engine, "{}").format(f"stage_{table.replace('.', '_')}_{uuid4().hex[:8]}")
+        if self.engine in c.MERGE_UNIQUE_SOURCE:
+            # a target row can be changed once per statement, the last row of a key wins
+            lowered = iter_lowered(fields)
+            key = itemgetter(*[lowered.index(key) for key in iter_lowered(keys)])
+            data = list({key(row): row for row in data}.values())
+        self.execute(c.STAGE_TABLE[self.engine].format(stage, table, ", ".join(fields)))
+        try:
+            count = self.bulk_insert(stage, data, fields, batch_size)
+            self.execute(upsert_sql(table, tuple(fields), tuple(keys), self.engine, self.placeholder, stage))
+        finally:
+            self.execute(c.DROP_STAGE[self.engine].format(stage))
+        return count
 
     def callproc(self, procname: str, *args, **kwargs):
         if self.engine == c.ACCESS:
@@ -169,57 +297,25 @@ class Database(DBConnection):
             version = self.connection.version
         return str(version)
 
+    @property
+    def catalog(self) -> SchemaCatalog:
+        if self._catalog is None:
+            self._catalog = SchemaCatalog(self)
+        return self._catalog
+
     @property
     def tables(self) -> tuple:
-        result: tuple = None
-        sql = c.METADATA[c.TABLES, self.engine]
-        if self.engine != c.ACCESS:
-            cursor = self.connection.cursor()
-            cursor.execute(sql)
-            result = tuple(item[0] for item in cursor.fetchall())
-            cursor.close()
-            del cursor
-        return result
+        return None if self.engine == c.ACCESS else self.catalog.tables
     
     @property
     def views(self) -> dict:
-        result: dict = {}
-        sql = c.METADATA[c.VIEWS, self.engine]
-        if self.engine != c.ACCESS:
-            cursor = self.connection.cursor()
-            cursor.execute(sql)
-            for item in cursor.fetchall():
-                result[item[0]] = {
-                    'sql_text': str(item[1]),
-                    'check_option': item[2], 
-                    'is_updatable': item[3],
-                    'is_insertable': item[4],
-                    'is_deletable': item[5],
-                }
-            cursor.close()
-            del cursor
-        return result
-
-    def _object_columns(self, object_name: str, object_type: str=c.TAB_COL) -> dict:
-        result: dict = {}
-        sql = c.METADATA[object_type, self.engine].format(object_name)
-        if self.engine != c.ACCESS:
-            cursor = self.connection.cursor()
-            cursor.execute(sql)
-            for item in cursor.fetchall():
-                result[item[1]] = {
-                    'id': item[0],
-                    'type': item[2], 
-                    'is_nullable': item[3],
-                    'default_value': item[4],
-                    'comment': str(item[5]),
-                }
-            cursor.close()
-            del cursor
-        return result
+        return self.catalog.views
 
     def table_columns(self, table: str) -> dict:
-        return self._object_columns(table, c.TAB_COL)
+        return self.catalog.object_columns(table)
 
     def view_columns(self, view: str) -> dict:
-        return self._object_columns(view, c.VIEW_COL)
\ No newline at end of file
+        return self.catalog.object_columns(view)
+
+    def indexes(self, table: str) -> dict:
+        return self.catalog.table_indexes(table)
@@ -1,23 +1,50 @@
 import os
 import csv
 import json
+import weakref
+from collections.abc import Iterator
+from operator import itemgetter
+from itertools import chain, compress, islice
 from typing import Self
-from io import TextIOWrapper, BytesIO
+from io import BytesIO
 from openpyxl import Workbook, load_workbook
-from openpyxl.styles import Font, Border, Side, PatternFill, numbers
-from .database import Database
-from .ssh import SSH
-from .constants import XLSX_MAX_ROWS
-from .utils import iter_lowered, yield_list, file_extension, to_list, iter_in_str
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Border, Side, PatternFill, NamedStyle, numbers
+from openpyxl.utils import get_column_letter
+from .pool import get_database
+from .columnar import ColumnStore, Row, Rows
+from .aggregate import GroupBy
+from .csvio import CSVReader, write_csv
+from .jsonio import NDJSONReader, finite, write_json
+from .query import Expression, sort_keys, sort_positions, top_rows
+from .xlsx import write_sheets, check_title
+from .partition import PartitionReader, partition_queries
+from .fetch import iter_result, prefetch
+from .plan import Plan
+from .arrow import (
+    arrow_to_store, store_to_batch, rows_to_batches, batches_to_table,
+    read_parquet, write_parquet, parquet_columns, read_feather, write_feather,
+)
+from .constants import XLSX_MAX_ROWS, XLSX_WIDTH_SAMPLE_ROWS, BATCH_SIZE, PARTITIONS
+from .utils import close_all, iter_lowered, iter_chunks, file_extension, to_list, iter_in_str
+
+LEFT_JOIN = "left"
+INNER_JOIN = "inner"
+RIGHT_JOIN = "right"
+FULL_JOIN = "full"
+JOIN_TYPES = (LEFT_JOIN, INNER_JOIN, RIGHT_JOIN, FULL_JOIN)
 
 
 class Dataset:
-    data: list = []
+    _store: ColumnStore
+    _stream: Iterator = None
+    _plan: Plan = None
     columns: list = []
     extra_data: list = []
     column_prefix: str = "Col"
 
     def __init__(self, data=None, columns: list|tuple|str=None, **kwargs) -> None:
+        self._store = ColumnStore()
         if data:
             # from records
             if isinstance(data, (list, tuple, set)):
@@ -47,8 +74,33 @@ class Dataset:
             self.extra_data = self.as_matrix(self.extra_data)
         self.column_prefix = kwargs.get("column_prefix", self.column_prefix)
 
+    @property
+    def data(self) -> Rows:
+        return Rows(self._store, self.widen_columns)
+
+    def widen_columns(self, width: int) -> None:
+        # rows wider than the dataset add positional columns, Col3, Col4...
+        columns = self.__dict__.get("columns")
+        if columns:
+            columns.extend(f"{self.column_prefix}{i+1}" for i in range(len(columns), width))
+
+    @data.setter
+    def data(self, data) -> None:
+        self._store = data.store.copy() if isinstance(data, Rows) else ColumnStore.from_rows(data)
+
+    @data.deleter
+    def data(self) -> None:
+        self._store = ColumnStore()
+
+    @classmethod
+    def from_store(cls, store: ColumnStore, columns: list) -> Self:
+        dataset = cls()
+        dataset._store = store
+        dataset.columns = list(columns)
+        return dataset
+
     def copy(self):
-        return Dataset(self.data, self.columns)
+        return Dataset.from_store(self._store.copy(), self.columns)
     
     def from_records(self, data: list|tuple|set, columns: list|tuple|str=None) -> Self:
         if isinstance(data, set):
@@ -67,120 +119,247 @@ class Dataset:
         return self
 
     def from_dataset(self, data: Self) -> Self:
-        self.data = list(data.data)
+        self._store = data._store.copy()
         self.columns = list(data.columns)
         return self
 
-    def from_sql(self, database, sql_text: str, sql_params=None, as_list: bool=False) -> Self:
-        def itercursor(cursor, batch_size=100000):
-            while True:
-                rows = cursor.fetchmany(batch_size)
-                if not rows:
-                    break
-                yield rows
+    def from_sql(
+        self,
+        database,
+        sql_text: str,
+        sql_params=None,
+        as_list: bool=False,
+        stream: bool=False,
+        batch_size: int=None,
+        partition_by: str|list=None,
+        partitions: int=PARTITIONS,
+        workers: int=None,
+        server_side: bool=False,
+    ) -> Self:
+        def itercursor(batches):
+            try:
+                yield from batches
+            finally:
+                release()
         is_url = isinstance(database, str)
         if is_url:
-            database = Database(database)
-        cursor = database.connection.cursor()
-        cursor.execute(sql_text, sql_params)
-        self.columns = [desc[0] for desc in cursor.description]
+            database = get_database(database)
+        if partition_by is not None:
+            # slices run concurrently on their own connections, merged in slice order
+            try:
+                queries = partition_queries(database, sql_text, sql_params, partition_by, partitions)
+            finally:
+                if is_url:
+                    database.close()
+            reader = PartitionReader(database.url, queries, workers, batch_size, server_side=server_side)
+            self.columns = reader.columns
+            if stream:
+                self._stream = self.list_batches(reader) if as_list else iter(reader)
+                # an abandoned stream stops the workers and closes their connections once collected
+                weakref.finalize(self._stream, reader.close)
+            else:
+                self._store = ColumnStore.from_batches(reader, len(self.columns), typed=not as_list)
+            return self
+        # server side cursors keep the memory bounded by the fetch batch
+        cursor = database.server_cursor() if server_side else database.connection.cursor()
+        try:
+            prefetch(cursor)
+            cursor.execute(sql_text, sql_params)
+            # batch_size=None sizes the batches from the result width and fetch latency
+            self.columns, batches = iter_result(cursor, batch_size)
+        except Exception:
+            close_all(cursor, database if is_url else None)
+            raise
         # data = cursor.fetchall()
-        data = []
-        for rows in itercursor(cursor):
-            data.extend([list(row) for row in rows])
-        self.data = [list(row) for row in data] if as_list else data
-        del cursor
-        if is_url:
-            database.close()
+        rows = itercursor(self.list_batches(batches) if as_list and stream else batches)
+        # the cursor is closed at the end of the rows, or once an abandoned stream is collected
+        release = weakref.finalize(rows, close_all, cursor, database if is_url else None)
+        if stream:
+            # rows are fetched while the dataset is consumed
+            self._stream = rows
+        else:
+            # as_list keeps the fetched values in plain list columns, no typed arrays
+            self._store = ColumnStore.from_batches(rows, len(self.columns), typed=not as_list)
+        return self
+
+    @staticmethod
+    def list_batches(batches: Iterator) -> Iterator[list]:
+        return ([list(row) for row in rows] for rows in batches)
+
+    @property
+    def is_stream(self) -> bool:
+        # from the source: a lazy plan over an in-memory dataset can be read again
+        return self.__dict__.get("_stream") is not None
+
+    @property
+    def is_lazy(self) -> bool:
+        return self.__dict__.get("_plan") is not None
+
+    def lazy(self) -> Self:
+        # convert, remove, rename_columns, append_default_values, auto_increment and
+        # column selection are planned and run in one pass when the data is consumed
+        if not self.is_lazy:
+            self._plan = Plan(len(self.columns))
         return self
 
-    def from_csv(self, file_name: str, delimiter: str=',', quotechar: str='"', quoting=csv.QUOTE_MINIMAL, column_index: int|bool=1, encoding: str='utf-8', ssh=None) -> Self:
-        is_ssh_instance = not isinstance(ssh, str)
-        if ssh:
-            if isinstance(ssh, str):
-                ssh = SSH(ssh)
-            csv_file = TextIOWrapper(ssh.sftp.file(os.path.join(ssh.path, file_name)), encoding=encoding)
+    def collect(self) -> Self:
+        self._store
+        return self
+
+    def batches(self, size: int=BATCH_SIZE) -> Iterator[list]:
+        if self.is_lazy:
+            # a lazy in-memory dataset keeps its plan, a lazy stream is consumed
+            plan, stream = self._plan, self.__dict__.get("_stream")
+            if stream is not None:
+                self._stream = self._plan = None
+                self._consumed = True
+            yield from plan.batches(self.__dict__["_store"] if stream is None else stream, size)
+        elif self.is_stream:
+            stream, self._stream = self._stream, None
+            self._consumed = True
+            yield from stream
+        else:
+            yield from self._store.batches(size)
+
+    def chunks(self, size: int=BATCH_SIZE) -> Iterator[Self]:
+        for rows in self.batches(size):
+            yield Dataset.from_store(ColumnStore.from_rows(rows), self.columns)
+
+    def iterrows(self) -> Iterator:
+        if self.is_stream or self.is_lazy:
+            return chain.from_iterable(self.batches())
+        return self._store.rows()
+
+    def from_csv(self, file_name: str, delimiter: str=',', quotechar: str='"', quoting=csv.QUOTE_MINIMAL, column_index: int|bool=1, encoding: str='utf-8', ssh=None, stream: bool=False, batch_size: int=BATCH_SIZE, types: bool|list|dict=None) -> Self:
+        reader = CSVReader(file_name, delimiter, quotechar, quoting, column_index, encoding, ssh, batch_size, types)
+        if column_index:
+            self.columns = reader.columns
+        if stream:
+            self._stream = iter(reader)
         else:
-            csv_file = open(file_name, encoding=encoding)
-        with csv_file:
-            csv_reader = csv.reader(csv_file, delimiter=delimiter, quotechar=quotechar, quoting=quoting)
-            data = list(csv_reader)
-            self.data = data[int(column_index):]
-            if column_index:
-                self.columns = data[column_index-1]
-        if ssh and not is_ssh_instance:
-            ssh.close()
+            self._store = ColumnStore.from_batches(reader, len(reader.columns))
         return self
     
     def from_worksheet(self, worksheet, column_index: int|bool=1, extra_data:bool=True, empty_cols:bool=False) -> Self:
-        if not empty_cols: # remove empty cols
-            for i in sorted((j for j, cell in enumerate(list(worksheet.rows)[column_index-1], start=1) if not cell.value), reverse=True):
-                worksheet.delete_cols(i)
-        data = list(worksheet.iter_rows(1, worksheet.max_row))
-        self.data = [[cell.value for cell in row] for row in data[int(column_index):]]
+        column_index = int(column_index)
+        rows = worksheet.iter_rows(values_only=True)
+        head = [list(row) for row in islice(rows, column_index)]
+        header = head[-1] if column_index and head else []
+        if not empty_cols and any(header): # remove empty cols, an all blank header keeps them
+            keep = [j for j, value in enumerate(header) if value]
+            project = itemgetter(*keep) if len(keep) > 1 else (lambda row: (row[keep[0]], ) if keep else ())
+            pad = lambda row: row if len(row) > keep[-1] else (*row, *[None] * (keep[-1] + 1 - len(row)))
+            head = [list(project(pad(row))) for row in head]
+            rows = (project(pad(row)) for row in rows)
+        self._store = ColumnStore.from_batches((list(data) for data in iter_chunks(rows, BATCH_SIZE)), len(head[-1]) if head else None)
         if column_index:
-            self.columns = [cell.value or None for cell in data[int(column_index)-1]]
-        if extra_data and int(column_index) > 1:
-            self.extra_data = [[cell.value for cell in row] for row in data[:int(column_index)-1]]
+            # an all blank header gets the positional Col1, Col2... names
+            self.columns = [value or None for value in head[-1]] if head and any(head[-1]) else []
+        if extra_data and column_index > 1:
+            self.extra_data = head[:-1]
         return self
     
-    def from_excel(self, file_name: str, sheet_name: str=None, column_index: int|bool=1, extra_data:bool=True, empty_cols:bool=False) -> Self:
-        workbook = load_workbook(file_name)
+    def from_excel(self, file_name: str, sheet_name: str=None, column_index: int|bool=1, extra_data:bool=True, empty_cols:bool=False, read_only: bool=False) -> Self:
+        workbook = load_workbook(file_name, read_only=read_only)
         worksheet = workbook[sheet_name] if sheet_name else workbook.active
         self.from_worksheet(worksheet, column_index, extra_data, empty_cols)
         workbook.close()
         return self
 
-    def to_csv(self, file_name: str, delimiter: str=',', quotechar: str='"', quoting=csv.QUOTE_MINIMAL, header: bool=True, encoding: str='utf-8') -> None:
-        with open(file_name, mode='w', newline='', encoding=encoding) as csv_file:
-            csv_writer = csv.writer(csv_file, delimiter=delimiter, quotechar=quotechar, quoting=quoting, lineterminator='\n')
-            if header:
-                csv_writer.writerow(self.columns)
-            csv_writer.writerows(self.data)
+    def to_csv(self, file_name: str, delimiter: str=',', quotechar: str='"', quoting=csv.QUOTE_MINIMAL, header: bool=True, encoding: str='utf-8', ssh=None) -> None:
+        write_csv(file_name, self.iterrows(), self.columns, delimiter, quotechar, quoting, header, encoding, ssh)
 
-    def to_excel(self, file_name: str, sheet_name: str=None, formatted: bool=True, stream: bool=False) -> str|BytesIO:
-        return dataset_to_excel(file_name, self, sheet_names=sheet_name, formatted=formatted, stream=stream)
+    def to_excel(self, file_name: str, sheet_name: str=None, formatted: bool=True, stream: bool=False, write_only: bool=False, processes: int|bool=None) -> str|BytesIO:
+        return dataset_to_excel(file_name, self, sheet_names=sheet_name, formatted=formatted, stream=stream, write_only=write_only, processes=processes)
 
     def to_dict(self) -> list[dict]:
-        return [dict(zip(self.columns, row)) for row in self.data]
-
-    def to_json(self, file_name: str=None) -> dict:
-        json_data = json.dumps(self.to_dict(), indent = 4)
-        if file_name:
-            with open(file_name, "w") as file: 
-                json.dump(json_data, file)
-        return json_data
+        return [dict(zip(self.columns, row)) for row in self._store.rows()]
+
+    def to_json(self, file_name: str|object=None, lines: bool=None, ssh=None, batch_size: int=BATCH_SIZE) -> str|None:
+        if file_name is None:
+            return json.dumps(
+                [{column: finite(value) for column, value in row.items()} for row in self.to_dict()], indent = 4, default=str, allow_nan=False
+            )
+        # streamed by batches, JSON Lines for .jsonl / .ndjson files, otherwise a JSON array;
+        # the text is not built, only the file is written
+        if lines is None:
+            lines = isinstance(file_name, str) and file_extension(file_name) in ("jsonl", "ndjson")
+        write_json(file_name, self.batches(batch_size), self.columns, lines, ssh)
+
+    def from_json(self, file_name: str|object, columns: list=None, ssh=None, stream: bool=False, batch_size: int=BATCH_SIZE) -> Self:
+        reader = NDJSONReader(file_name, columns, ssh, batch_size)
+        self.columns = reader.columns
+        if stream:
+            self._stream = iter(reader)
+        else:
+            self._store = ColumnStore.from_batches(reader, len(reader.columns))
+        return self
     
-    def to_sql(self, database, table: str, auto_commit: bool=True) -> None:
+    def from_arrow(self, data) -> Self:
+        self._store, self.columns = arrow_to_store(data)
+        return self
+
+    def to_record_batches(self, batch_size: int=None) -> Iterator:
+        if self.is_stream or self.is_lazy:
+            yield from rows_to_batches(self.batches(batch_size or BATCH_SIZE), self.columns)
+            return
+        # typed columns are copied once, slices are views of one batch
+        batch = store_to_batch(self._store, self.columns)
+        if not batch_size:
+            yield batch
+            return
+        for offset in range(0, batch.num_rows, batch_size):
+            yield batch.slice(offset, batch_size)
+
+    def to_arrow(self):
+        return batches_to_table(self.to_record_batches(), self.columns)
+
+    def from_parquet(self, file_name: str, columns: list=None, stream: bool=False, batch_size: int=BATCH_SIZE) -> Self:
+        if not stream:
+            return self.from_arrow(read_parquet(file_name, columns))
+        batches = read_parquet(file_name, columns, batch_size)
+        self.columns = columns or parquet_columns(file_name)
+        self._stream = (list(arrow_to_store(batch)[0].rows()) for batch in batches)
+        return self
+
+    def to_parquet(self, file_name: str, compression: str="zstd", batch_size: int=None) -> str:
+        return write_parquet(file_name, self.to_record_batches(batch_size), compression, self.columns)
+
+    def from_feather(self, file_name: str, columns: list=None) -> Self:
+        return self.from_arrow(read_feather(file_name, columns))
+
+    def to_feather(self, file_name: str, compression: str="zstd") -> str:
+        return write_feather(file_name, self.to_arrow(), compression)
+
+    def to_sql(self, database, table: str, auto_commit: bool=True, batch_size: int=BATCH_SIZE) -> int:
         is_url = isinstance(database, str)
         if is_url:
-            database = Database(database)
-        cursor = database.connection.cursor() if is_url else database.cursor
-        bind_columns = ",".join(self.columns)
-        bind_params = ",".join([database.placeholder.format(column) for column in self.columns])
-        if hasattr(cursor, 'fast_executemany'):
-                cursor.fast_executemany = True
-        cursor.executemany(f"INSERT INTO {table} ({bind_columns}) VALUES ({bind_params})", self.data) 
-        if auto_commit:
-            cursor.connection.commit()
-        if is_url: 
-            del cursor
-            database.close()
+            database = get_database(database)
+        try:
+            # COPY / array binding / multi-row VALUES depending on the driver,
+            # with auto_commit every batch is its own transaction
+            count = database.bulk_insert(table, chain.from_iterable(self.batches()), self.columns, batch_size, commit=auto_commit)
+            if auto_commit:
+                database.commit()
+        finally:
+            if is_url:
+                database.close()
+        return count
 
     @property
     def columns_lowered(self) -> list:
         return iter_lowered(self.columns)
     
     @property
-    def is_empty(self) -> list:
-        return len(self.data[0]) == 0 if self.data else True
+    def is_empty(self) -> bool:
+        return self._store.length == 0 or self._store.width == 0
     
     @staticmethod
     def as_matrix(data) -> list:
         matrix = []
         if not data:
             return [[]]
-        elif data and not isinstance(data[0], (list, tuple, dict, set)):
+        elif data and not isinstance(data[0], (list, tuple, dict, set, Row)):
             matrix.append(data)
             return matrix
         return list(data)
@@ -201,11 +380,30 @@ class Dataset:
     def max_value_len(data: list|tuple) -> list:
         return [len(max([str(row[i]) for row in data], key=len)) for i in range(len(data[0]))]
     
+    def __setattr__(self, name: str, value) -> None:
+        # new data replaces a consumed stream
+        if name in ("_store", "_stream", "_plan") and value is not None:
+            self.__dict__.pop("_consumed", None)
+        super().__setattr__(name, value)
+
     def __getattribute__(self, name: str):
-        if name == "columns":
+        if name == "_store" and self.__dict__.get("_consumed"):
+            raise RuntimeError("Dataset stream already consumed, collect() it to read the rows more than once.")
+        if name == "_store" and self.__dict__.get("_plan") is not None:
+            # run the plan of a lazy dataset on first in-memory access
+            plan, stream, self._plan, self._stream = self._plan, self.__dict__.get("_stream"), None, None
+            if stream is None:
+                self._store = plan.apply(self._store)
+            else:
+                self._store = ColumnStore.from_batches(plan.batches(stream, BATCH_SIZE), len(plan))
+        elif name == "_store" and self.__dict__.get("_stream") is not None:
+            # materialize a streamed dataset on first in-memory access
+            stream, self._stream = self._stream, None
+            self._store = ColumnStore.from_batches(stream, len(self.__dict__.get("columns") or []))
+        elif name == "columns":
             columns = self.__dict__.get(name)
-            if (not columns) and self.data:
-                self.columns = [f"{self.column_prefix}{i+1}" for i in range(len(self.data[0]))]
+            if (not columns) and not self.__dict__.get("_consumed") and self._store.length:
+                self.columns = [f"{self.column_prefix}{i+1}" for i in range(self._store.width)]
             if not isinstance(columns, list):
                 self.columns = to_list(columns)
         return super().__getattribute__(name)
@@ -213,24 +411,28 @@ class Dataset:
     def __getitem__(self, item) -> Self:
         item = to_list(item, slice_stop=len(self.columns))
         if item:
-            # return list([data[idx] for idx in self.columns_index(item)] for data in self.data)
-            data = list([data[idx] for idx in self.columns_index(item)] for data in self.data)
-            columns = list(self.columns[idx] for idx in self.columns_index(item))
-            return Dataset(data, columns)
+            index = self.columns_index(item)
+            if self.is_lazy:
+                # the selection shares the source, a lazy stream moves to the selection
+                dataset = Dataset.from_store(self.__dict__["_store"], [self.columns[idx] for idx in index])
+                dataset._plan = self._plan.select(index)
+                if self.__dict__.get("_stream") is not None:
+                    dataset._stream, self._stream, self._plan = self._stream, None, None
+                return dataset
+            return Dataset.from_store(self._store.select(index), [self.columns[idx] for idx in index])
         else:
             raise TypeError("Invalid Argument Type")
     
     def __setitem__(self, key, value) -> None:
         key = to_list(key, slice_stop=len(self.columns))
         value = self.as_matrix(to_list(value, slice_stop=len(self.columns)))
-        for j, row in enumerate(self.data):
-            for i, idx in enumerate(self.columns_index(key)):
-                row[idx] = value[i][j]
+        for i, idx in enumerate(self.columns_index(key)):
+            self._store.set_column(idx, [value[i][j] for j in range(self._store.length)])
     
     def values(self, columns=None) -> list:
         columns = self.columns_index(columns or self.columns)
         if columns:
-            return list([data[idx] for data in self.data] for idx in columns)
+            return [self._store.values(idx) for idx in columns]
         else:
             raise TypeError("Invalid Argument Type")
 
@@ -250,42 +452,84 @@ class Dataset:
         columns.sort()
         for i, index in enumerate(columns):
             self.columns.pop(index - i)
-        for item in self.data:
-            for i, index in enumerate(columns):
-                item.pop(index - i)
+            if not self.is_lazy:
+                self._store.pop_column(index - i)
+        if self.is_lazy:
+            self._plan.remove(columns)
         return self
 
     def append_default_values(self, data: dict):
         data = {k: v for k, v in data.items() if k not in self.columns}
         self.columns.extend(data.keys())
-        for item in self.data:
-            item.extend(data.values())
+        for value in data.values():
+            if self.is_lazy:
+                self._plan.append(value)
+            else:
+                self._store.append_column([value] * self._store.length)
 
     def auto_increment(self, columns, start: int=1):
-        columns = self.columns_index(columns)
-        for seq, value in enumerate(self.data, start=start):
-            for idx in columns:
-                value[idx] = seq
-
-    def left_join(self, dataset, columns_by: str) -> Self:
-        columns_by = columns_by.split("=")
-        column_source = columns_by[0]
-        column_target = column_source if len(columns_by) == 1 else columns_by[1]
+        if self.is_lazy:
+            self._plan.increment(self.columns_index(columns), start)
+            return
+        for idx in self.columns_index(columns):
+            self._store.set_column(idx, range(start, start + self._store.length))
+
+    def join(self, dataset, columns_by: str, how: str="left", first_match: bool=False) -> Self:
+        if how not in JOIN_TYPES:
+            raise ValueError(f"Unknown join type '{how}', expected one of {', '.join(JOIN_TYPES)}.")
+        # "a=b, c" -> source columns (a, c), target columns (b, c)
+        columns_by = [item.split("=") for item in to_list(columns_by)]
         error_msg = "Columns {} not in dataset."
-        try:
-            source_index = self.columns_lowered.index(column_source.lower())
-        except ValueError:
-            raise ValueError(error_msg.format(column_source))
-        try:
-            target_index = iter_lowered(dataset.columns).index(column_target.lower())
-        except ValueError:
-            raise ValueError(error_msg.format(column_target))
-        # append do data
-        for row in self.data:
-            target_row  = next((item for item in dataset.data if item[target_index]==row[source_index]), len(dataset.columns)*[None])
-            row.extend([item for i, item in enumerate(target_row) if i != target_index])
+        source_index, target_index = [], []
+        for item in columns_by:
+            column_source = item[0].strip()
+            column_target = item[-1].strip()
+            try:
+                source_index.append(self.columns_lowered.index(column_source.lower()))
+            except ValueError:
+                raise ValueError(error_msg.format(column_source))
+            try:
+                target_index.append(iter_lowered(dataset.columns).index(column_target.lower()))
+            except ValueError:
+                raise ValueError(error_msg.format(column_target))
+        source, target = self._store, dataset._store
+        keys = lambda store, index: store.columns[index[0]] if len(index) == 1 else zip(*(store.columns[idx] for idx in index))
+        # build hash index on the right side once
+        hash_index = {}
+        for position, key in enumerate(keys(target, target_index)):
+            hash_index.setdefault(key, []).append(position)
+        # probe with the left side
+        left_rows, right_rows = [], []
+        matched = bytearray(target.length) if how in (RIGHT_JOIN, FULL_JOIN) else None
+        keep_unmatched = how in (LEFT_JOIN, FULL_JOIN)
+        for position, key in enumerate(keys(source, source_index)):
+            positions = hash_index.get(key)
+            if positions is None:
+                if keep_unmatched:
+                    left_rows.append(position)
+                    right_rows.append(None)
+                continue
+            for target_position in positions[:1] if first_match else positions:
+                left_rows.append(position)
+                right_rows.append(target_position)
+                if matched is not None:
+                    matched[target_position] = 1
+        if matched is not None:
+            for target_position in (i for i, flag in enumerate(matched) if not flag):
+                left_rows.append(None)
+                right_rows.append(target_position)
+        store = source.take(left_rows)
+        if matched is not None:
+            # right only rows take their key values from the right side
+            for idx, target_idx in zip(source_index, target_index):
+                column = target.columns[target_idx]
+                store.set_column(idx, (column[right_rows[i]] if row is None else value for i, (row, value) in enumerate(zip(left_rows, store.columns[idx]))))
+        target_columns = [i for i in range(target.width) if i not in target_index]
+        for values in target.take(right_rows, target_columns).columns:
+            store.append_column(values)
+        self._store = store
         # rename duplicates columns
-        column_target = [col for i, col in enumerate(dataset.columns) if i != target_index]
+        column_target = [dataset.columns[i] for i in target_columns]
         for i, column in enumerate(column_target):
             if column.lower() in self.columns_lowered:
                 cnt = 1
@@ -296,38 +540,97 @@ class Dataset:
                     cnt += 1
             self.columns.append(column)
         return self
+
+    def left_join(self, dataset, columns_by: str, first_match: bool=True) -> Self:
+        return self.join(dataset, columns_by, LEFT_JOIN, first_match)
+
+    def inner_join(self, dataset, columns_by: str, first_match: bool=False) -> Self:
+        return self.join(dataset, columns_by, INNER_JOIN, first_match)
+
+    def right_join(self, dataset, columns_by: str, first_match: bool=False) -> Self:
+        return self.join(dataset, columns_by, RIGHT_JOIN, first_match)
+
+    def full_join(self, dataset, columns_by: str, first_match: bool=False) -> Self:
+        return self.join(dataset, columns_by, FULL_JOIN, first_match)
     
-    def query(self) -> Self:
+    def group_by(self, columns=None) -> GroupBy:
+        return GroupBy(self, columns)
+
+    def query(self, where: str=None, order_by=None, limit: int=None, columns=None) -> Self:
+        result = self.where(where) if where else self
+        if order_by:
+            result = result.top(limit, order_by) if limit else result.sort(order_by)
+        elif limit:
+            result = result.head(limit)
+        return result[columns] if columns else result
+
+    def expression(self, text: str) -> Expression:
+        return Expression(text, self.columns_index)
+
+    def where(self, condition: str) -> Self:
+        expression = self.expression(condition)
+        if self.is_stream:
+            # filter every fetched batch, the result stays streamed
+            def filtered(batches):
+                for rows in batches:
+                    rows = list(compress(rows, expression.evaluate(ColumnStore.from_rows(rows))))
+                    if rows:
+                        yield rows
+            dataset = Dataset(columns=self.columns)
+            dataset.columns = list(self.columns)
+            dataset._stream = filtered(self.batches())
+            return dataset
+        return Dataset.from_store(self._store.take(expression.mask(self._store)), self.columns)
+
+    def sort(self, order_by) -> Self:
+        positions = sort_positions(self._store, sort_keys(order_by, self.columns_index))
+        return Dataset.from_store(self._store.take(positions), self.columns)
+
+    def top(self, n: int, order_by) -> Self:
+        rows = top_rows(self.iterrows(), n, sort_keys(order_by, self.columns_index))
+        return Dataset.from_store(ColumnStore.from_rows(rows) if rows else ColumnStore([[] for _ in self.columns]), self.columns)
+
+    def head(self, n: int) -> Self:
+        if self.is_stream or self.is_lazy:
+            return Dataset.from_store(ColumnStore.from_rows(list(islice(self.iterrows(), n))), self.columns)
+        return Dataset.from_store(self._store.take(range(min(n, self._store.length))), self.columns)
+
+    def add_column(self, name: str, expression: str) -> Self:
+        values = self.expression(expression).evaluate(self._store)
+        self._store.append_column(values.tolist() if hasattr(values, "tolist") else values)
+        self.columns.append(name)
         return self
     
     def union(self, data: list|tuple|Self) -> Self:
-        data = data.data if isinstance(data, Dataset) else self.as_matrix(data)
-        source_len = len(self.data[0])
-        target_len = len(data[0])
+        store = data._store if isinstance(data, Dataset) else ColumnStore.from_rows(self.as_matrix(data))
+        source_len = self._store.width
+        target_len = store.width
         if source_len != target_len:
             raise ValueError(f'Different length of data (source: {source_len}, target: {target_len}).')
-        self.data.extend(data)
+        self._store.extend_store(store)
         return self
     
     def unique(self, columns=None) -> Self:
         columns = self.columns_index(columns or self.columns)
-        data = [list(item) for item in set(tuple(data[idx] for idx in columns) for data in self.data)]
+        data = list(set(zip(*(self._store.columns[idx] for idx in columns))))
         # return data
         columns = list(self.columns[idx] for idx in columns)
-        return Dataset(data, columns)
+        return Dataset.from_store(ColumnStore.from_rows(data), columns)
         # return [list(item) for item in set(tuple(item) for item in self.values(columns))]
 
     def convert(self, to_type, columns=None) -> Self:
         columns = self.columns_index(columns or self.columns)
-        for data in self.data:
-            for idx in columns:
-                data[idx] = to_type(data[idx])
+        if self.is_lazy:
+            self._plan.convert(columns, to_type)
+            return self
+        for idx in columns:
+            self._store.set_column(idx, map(to_type, self._store.columns[idx]))
         return self
 
     def __str__(self) -> str:
         if self.columns:
-            if len(self.columns) != len(self.data[0]):
-                raise ValueError(f'Different length of columns({len(self.columns)}) and data({len(self.data[0])}).')
+            if len(self.columns) != self._store.width:
+                raise ValueError(f'Different length of columns({len(self.columns)}) and data({self._store.width}).')
             SHOW_ROWS = 3
             SHOW_COLS = 5
             MAX_TEXT_LEN = 10
@@ -350,12 +653,22 @@ class Dataset:
             return "Empty dataset."
         
     def __repr__(self) -> str:
-        return f"Dataset object ({len(self.data)} rows, {len(self.columns)} columns)"
+        if self.__dict__.get("_consumed"):
+            return f"Dataset object (stream consumed, {len(self.columns)} columns)"
+        if self.is_lazy:
+            return f"Dataset object (lazy, {len(self.columns)} columns)"
+        if self.is_stream:
+            return f"Dataset object (streamed, {len(self.columns)} columns)"
+        return f"Dataset object ({len(self._store)} rows, {len(self.columns)} columns)"
 
     def __enter__(self) -> Self:
         return self
 
     def close(self) -> None:
+        if self.__dict__.get("_stream") is not None:
+            self._stream.close()
+            self._stream = None
+        self._plan = None
         del self.data
         del self.extra_data
         del self.columns
@@ -364,22 +677,96 @@ class Dataset:
         self.close()
 
 
-def dataset_to_excel(file_name, *datasets: Dataset, sheet_names=None, formatted: bool=True, stream: bool=False) -> str|BytesIO:
+EXCEL_TITLE_STYLE = "Dataset Title"
+EXCEL_HEADER_STYLE = "Dataset Header"
+
+
+def column_width(fieldname_len: int, maxvalue_len: int, auto_filter: bool=True) -> float:
+    length = max(fieldname_len, maxvalue_len)
+    return (length + (4.23 if fieldname_len >= maxvalue_len - 1 else 1.23) if auto_filter else length)*1.23
+
+
+def excel_named_styles(wb: Workbook) -> None:
+    side = Side(border_style='thin', color='000000')
+    border = Border(top=side, bottom=side, left=side, right=side)
+    wb.add_named_style(NamedStyle(name=EXCEL_TITLE_STYLE, font=Font(bold=True, size=12)))
+    wb.add_named_style(NamedStyle(name=EXCEL_HEADER_STYLE, font=Font(bold=True, size=12), border=border, fill=PatternFill("solid", start_color="D7E4BC")))
+
+
+def write_only_sheets(wb: Workbook, ds: Dataset, title: str, formatted: bool=True, titles: set=None) -> None:
+    def styled(ws, row, style):
+        cells = [WriteOnlyCell(ws, value) for value in row]
+        if formatted:
+            for cell in cells:
+                cell.style = style
+        return cells
+    for n, data in enumerate(iter_chunks(ds.iterrows(), XLSX_MAX_ROWS - 1 - len(ds.extra_data))):
+        ws = wb.create_sheet(check_title(f'{title}_ext{n}' if n else title, titles))
+        fields_row = 1 if n else len(ds.extra_data) + 1
+        # columns and panes are written before the rows, widths come from the first rows
+        sample = list(islice(data, XLSX_WIDTH_SAMPLE_ROWS))
+        if formatted:
+            header_len = [len(f"{column}") for column in ds.columns]
+            values_len = Dataset.max_value_len(sample) if sample else [0] * len(ds.columns)
+            for j, (fieldname_len, maxvalue_len) in enumerate(zip(header_len, values_len), start=1):
+                ws.column_dimensions[get_column_letter(j)].width = column_width(fieldname_len, maxvalue_len)
+            ws.freeze_panes = f'A{fields_row+1}'
+        if not n:
+            for extra_data in ds.extra_data:
+                ws.append(styled(ws, extra_data, EXCEL_TITLE_STYLE))
+        ws.append(styled(ws, ds.columns, EXCEL_HEADER_STYLE))
+        rows_count = 0
+        for row in chain(sample, data):
+            ws.append(row)
+            rows_count += 1
+        if formatted:
+            # autofilter header
+            ws.auto_filter.ref = f'A{fields_row}:{get_column_letter(max(len(ds.columns), 1))}{fields_row + rows_count}'
+
+
+def excel_sheets(datasets: tuple[Dataset], sheet_names: list):
+    # (title, columns, extra_data, data) for every sheet and _ext split
+    for i, ds in enumerate(datasets):
+        title = sheet_names[i] if sheet_names else f'Sheet{i+1}'
+        size = XLSX_MAX_ROWS - 1 - len(ds.extra_data)
+        if ds.is_stream or ds.is_lazy:
+            chunks = (list(data) for data in iter_chunks(ds.iterrows(), size))
+        else:
+            chunks = (ds._store.slice(start, start + size) for start in range(0, max(ds._store.length, 1), size))
+        for n, data in enumerate(chunks):
+            yield (f'{title}_ext{n}' if n else title), list(ds.columns), ds.extra_data if not n else [], data
+
+
+def dataset_to_excel(file_name, *datasets: Dataset, sheet_names=None, formatted: bool=True, stream: bool=False, write_only: bool=False, processes: int|bool=None) -> str|BytesIO:
     os.remove(file_name) if os.path.exists(file_name) else None
     sheet_names = to_list(sheet_names)
-    wb = Workbook()
+    # given titles checked before any sheet is started, _ext titles as they are added
+    titles = set()
+    for i in range(len(datasets)):
+        check_title(sheet_names[i] if sheet_names else f'Sheet{i+1}', titles)
+    if processes:
+        # sheet XML is built in a process pool and zipped here
+        return write_sheets(file_name, excel_sheets(datasets, sheet_names), formatted, stream, processes)
+    wb = Workbook(write_only=write_only)
+    if write_only and formatted:
+        excel_named_styles(wb)
+    titles = set()
     for i, ds in enumerate(datasets):
-        ws = wb.active if i==0 else wb.create_sheet()
         title = sheet_names[i] if sheet_names else f'Sheet{i+1}'
-        ws.title = title
+        if write_only:
+            # streamed rows, named header styles, no per cell pass
+            write_only_sheets(wb, ds, title, formatted, titles)
+            continue
+        ws = wb.active if i==0 else wb.create_sheet()
+        ws.title = check_title(title, titles)
         if ds.extra_data:
             for extra_data in ds.extra_data:
                 ws.append(extra_data)
         extra_sheets = 0
-        for data in yield_list(ds.data, XLSX_MAX_ROWS - 1 - len(ds.extra_data)):
+        for data in iter_chunks(ds.iterrows(), XLSX_MAX_ROWS - 1 - len(ds.extra_data)):
             if extra_sheets:
                 ws = wb.create_sheet()
-                ws.title = f'{title}_ext{extra_sheets}'
+                ws.title = check_title(f'{title}_ext{extra_sheets}', titles)
                 fields_row = 1
             else:
                 fields_row = len(ds.extra_data) + 1
@@ -410,9 +797,7 @@ def dataset_to_excel(file_name, *datasets: Dataset, sheet_names=None, formatted:
                 for col in ws.iter_cols():
                     fieldname_len = len(f"{col[fields_row-1].value}")
                     maxvalue_len = max([len(f"{cell.value}") for i, cell in enumerate(col, start=1) if i > fields_row])
-                    length = max(fieldname_len, maxvalue_len)
-                    length = (length + (4.23 if fieldname_len >= maxvalue_len - 1 else 1.23) if ws.auto_filter else length)*1.23
-                    ws.column_dimensions[col[fields_row-1].column_letter].width = length
+                    ws.column_dimensions[col[fields_row-1].column_letter].width = column_width(fieldname_len, maxvalue_len, bool(ws.auto_filter))
             extra_sheets += 1
     if stream:
         buffer = BytesIO()
@@ -426,9 +811,9 @@ def dataset_to_excel(file_name, *datasets: Dataset, sheet_names=None, formatted:
         wb.close()
         return file_name
 
-def excel_to_dataset(file_name, sheet_name=None, column_index: int|bool=1, empty_cols:bool=False, as_list=True) -> list|dict:
+def excel_to_dataset(file_name, sheet_name=None, column_index: int|bool=1, empty_cols:bool=False, as_list=True, read_only: bool=False) -> list|dict:
     data = [] if as_list else dict()
-    wb = load_workbook(file_name)
+    wb = load_workbook(file_name, read_only=read_only)
     if sheet_name:
         if isinstance(sheet_name, str):
             sheet_name = to_list(sheet_name)
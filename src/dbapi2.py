@@ -4,6 +4,7 @@
 from collections.abc import Mapping, Sequence, Iterator
 from typing import Any, Protocol, Literal, Self
 from typing_extensions import TypeAlias
+from .fetch import iter_fetch, prefetch
 
 
 DBAPITypeCode: TypeAlias = Any | None
@@ -56,6 +57,7 @@ class DBConnection:
         if conn:
             self._connection = conn
             self._cursor = conn.cursor()
+            prefetch(self._cursor)
         else:
             self.close()
 
@@ -88,12 +90,9 @@ class DBConnection:
     def cursor_create(self, *args, **kwargs) -> DBAPICursor:
         return self.connection.cursor(*args, **kwargs)
     
-    def iteritems(self, size: int=100000) -> Iterator[Sequence[Sequence[Any]]]:
-        while True:
-            rows = self.fetchmany(size)
-            if not rows:
-                break
-            yield rows
+    def iteritems(self, size: int=None) -> Iterator[Sequence[Sequence[Any]]]:
+        # size=None sizes batches from the result width and fetch latency
+        yield from iter_fetch(self.cursor, size)
 
     @property
     def description(self) -> Sequence[DBAPIColumnDescription] | None:
@@ -0,0 +1,157 @@
+import shlex
+import struct
+import hashlib
+import zlib
+from collections.abc import Iterable, Iterator
+from math import isqrt
+from .constants import DELTA_MIN_BLOCK, DELTA_MAX_BLOCK, DELTA_READ_SIZE, DELTA_MAX_LITERAL
+
+# instructions: copy block index of the old file, or literal data
+COPY = b"C"
+DATA = b"D"
+ADLER = 65521
+SIGNATURE_SIZE = 20
+RECORD = struct.Struct(">cQ")
+
+# run with python3 on the remote host, weak (adler32) and strong (md5) checksum per block
+SIGNATURE_SCRIPT = """
+import sys, zlib, hashlib
+path, size = sys.argv[1], int(sys.argv[2])
+out = sys.stdout.buffer
+with open(path, "rb") as f:
+    while True:
+        block = f.read(size)
+        if not block:
+            break
+        out.write(zlib.adler32(block).to_bytes(4, "big") + hashlib.md5(block).digest())
+"""
+
+# rebuilds the remote file from its own blocks and the literal data sent on stdin
+PATCH_SCRIPT = """
+import sys, os, struct
+path, size = sys.argv[1], int(sys.argv[2])
+temp = path + ".delta"
+src = sys.stdin.buffer
+with open(path, "rb") as base, open(temp, "wb") as out:
+    while True:
+        head = src.read(9)
+        if not head:
+            break
+        kind, value = struct.unpack(">cQ", head)
+        if kind == b"C":
+            base.seek(value * size)
+            out.write(base.read(size))
+        else:
+            while value:
+                chunk = src.read(min(value, 1048576))
+                if not chunk:
+                    raise EOFError("truncated delta")
+                out.write(chunk)
+                value -= len(chunk)
+os.chmod(temp, os.stat(path).st_mode)
+os.replace(temp, path)
+"""
+
+
+def block_size(size: int) -> int:
+    # about sqrt(size) like rsync, in whole KB
+    return max(DELTA_MIN_BLOCK, min(DELTA_MAX_BLOCK, isqrt(size) // 1024 * 1024))
+
+
+def signatures(file, size: int) -> list[tuple[int, bytes]]:
+    result = []
+    while block := file.read(size):
+        result.append((zlib.adler32(block), hashlib.md5(block).digest()))
+    return result
+
+
+def parse_signatures(data: bytes) -> list[tuple[int, bytes]]:
+    return [
+        (int.from_bytes(data[i:i + 4], "big"), data[i + 4:i + SIGNATURE_SIZE])
+        for i in range(0, len(data), SIGNATURE_SIZE)
+    ]
+
+
+def delta(file, signatures: list[tuple[int, bytes]], size: int) -> Iterator[tuple[bytes, int|bytes]]:
+    """COPY / DATA instructions that rebuild file from the blocks of the signed file.
+
+    The window moves a whole block on a match and rolls the adler32 checksum
+    one byte at a time otherwise, md5 confirms a weak match.
+    """
+    table = {}
+    for index, (weak, strong) in enumerate(signatures):
+        table.setdefault(weak, {}).setdefault(strong, index)
+    buffer = bytearray()
+    start = literal = 0
+    weak = None
+    eof = False
+    while True:
+        if not eof and len(buffer) - start <= size:
+            chunk = file.read(DELTA_READ_SIZE)
+            eof = not chunk
+            # bytes already sent are dropped
+            del buffer[:literal]
+            start -= literal
+            literal = 0
+            buffer += chunk
+            continue
+        available = len(buffer) - start
+        if not available:
+            break
+        if weak is None:
+            weak = zlib.adler32(buffer[start:start + size])
+        # the window is hashed only on a weak match
+        strong = table.get(weak)
+        index = strong.get(hashlib.md5(buffer[start:start + size]).digest()) if strong else None
+        if index is not None:
+            if start > literal:
+                yield DATA, bytes(buffer[literal:start])
+            yield COPY, index
+            start = literal = start + min(size, available)
+            weak = None
+            continue
+        if available <= size:
+            # the tail at the end of the file
+            break
+        out, new = buffer[start], buffer[start + size]
+        a = (weak & 0xffff) - out + new
+        b = (weak >> 16) - size * out + a - 1
+        weak = (b % ADLER) << 16 | a % ADLER
+        start += 1
+        if start - literal >= DELTA_MAX_LITERAL:
+            yield DATA, bytes(buffer[literal:start])
+            literal = start
+    if literal < len(buffer):
+        yield DATA, bytes(buffer[literal:])
+
+
+def encode(instructions: Iterable[tuple[bytes, int|bytes]]) -> Iterator[bytes]:
+    for kind, value in instructions:
+        if kind == COPY:
+            yield RECORD.pack(COPY, value)
+        else:
+            yield RECORD.pack(DATA, len(value)) + value
+
+
+def remote_python(script: str, *args) -> str:
+    return " ".join(("python3", "-c", shlex.quote(script), *map(shlex.quote, map(str, args))))
+
+
+def remote_signatures(ssh, path: str, size: int) -> list[tuple[int, bytes]]|None:
+    # None without python3 on the remote host
+    _, stdout, _ = ssh.exec_command(remote_python(SIGNATURE_SCRIPT, path, size))
+    data = stdout.read()
+    if stdout.channel.recv_exit_status() != 0:
+        return None
+    return parse_signatures(data)
+
+
+def remote_patch(ssh, path: str, instructions: Iterable[tuple[bytes, int|bytes]], size: int) -> None:
+    stdin, stdout, stderr = ssh.exec_command(remote_python(PATCH_SCRIPT, path, size))
+    for record in encode(instructions):
+        stdin.write(record)
+    stdin.flush()
+    stdin.channel.shutdown_write()
+    if stdout.channel.recv_exit_status() != 0:
+        raise IOError(f"Delta transfer of {path} failed: {stderr.read().decode(errors='replace').strip()}")
+
@@ -0,0 +1,97 @@
+import sys
+from collections.abc import Iterator, Sequence
+from itertools import chain, islice
+from time import perf_counter
+from . import constants as c
+
+
+def column_bytes(column: Sequence) -> int:
+    # description: name, type_code, display_size, internal_size, precision, scale, null_ok
+    size = next((value for value in (column[3], column[2]) if isinstance(value, int) and value > 0), None) if len(column) > 3 else None
+    return c.FETCH_VALUE_OVERHEAD + min(size or c.FETCH_COLUMN_BYTES, c.FETCH_MAX_COLUMN_BYTES)
+
+
+def row_bytes(description: Sequence) -> int:
+    return c.FETCH_ROW_OVERHEAD + sum(map(column_bytes, description or ()))
+
+
+def sample_bytes(rows: Sequence) -> int:
+    # measured size of the fetched values, from the first rows of a batch
+    sample = list(islice(rows, c.FETCH_SAMPLE_ROWS))
+    return c.FETCH_ROW_OVERHEAD + sum(sys.getsizeof(value) for row in sample for value in row) // len(sample)
+
+
+def prefetch(cursor) -> None:
+    # rows returned with the execute round trip (oracledb), set before execute
+    if hasattr(cursor, "prefetchrows"):
+        cursor.prefetchrows = c.FETCH_PREFETCH_ROWS
+
+
+class FetchSize:
+    """Rows per fetchmany, sized from the result width and a memory target
+    and tuned from the measured fetch latency.
+    """
+    size: int
+    limit: int
+
+    def __init__(self, cursor, target_bytes: int=c.FETCH_TARGET_BYTES) -> None:
+        self.cursor = cursor
+        self.target_bytes = target_bytes
+        self.measured_bytes = None
+        self.limit = self.rows(row_bytes(cursor.description))
+        self.size = min(self.limit, c.BATCH_SIZE)
+        self.apply()
+
+    def rows(self, bytes_per_row: int) -> int:
+        return max(c.FETCH_MIN_ROWS, min(c.FETCH_MAX_ROWS, self.target_bytes // max(bytes_per_row, 1)))
+
+    def apply(self) -> None:
+        # arraysize is the network fetch size of most drivers
+        try:
+            self.cursor.arraysize = self.size
+        except (AttributeError, TypeError, ValueError):
+            pass
+
+    def update(self, rows: Sequence, seconds: float) -> None:
+        if self.measured_bytes is None:
+            self.measured_bytes = sample_bytes(rows)
+            self.limit = self.rows(self.measured_bytes)
+        size = self.size
+        if len(rows) == size:
+            # fast fetches grow up to the memory limit, slow ones shrink for steady streaming
+            if seconds < c.FETCH_MIN_SECONDS:
+                size *= 2
+            elif seconds > c.FETCH_MAX_SECONDS:
+                size //= 2
+        size = max(c.FETCH_MIN_ROWS, min(self.limit, size))
+        if size != self.size:
+            self.size = size
+            self.apply()
+
+    def __repr__(self) -> str:
+        return f"FetchSize ({self.size} rows, limit {self.limit})"
+
+
+def iter_fetch(cursor, size: int=None, target_bytes: int=c.FETCH_TARGET_BYTES) -> Iterator[Sequence]:
+    """fetchmany batches, a fixed size or adaptive when size is None."""
+    if size:
+        while rows := cursor.fetchmany(size):
+            yield rows
+        return
+    fetch_size = FetchSize(cursor, target_bytes)
+    while True:
+        start = perf_counter()
+        rows = cursor.fetchmany(fetch_size.size)
+        if not rows:
+            break
+        fetch_size.update(rows, perf_counter() - start)
+        yield rows
+
+
+def iter_result(cursor, size: int=None) -> tuple[list, Iterator[Sequence]]:
+    """Column names and batches of an executed cursor."""
+    head = []
+    if cursor.description is None:
+        # psycopg2 named cursors describe the result with the first fetch
+        head = [rows for rows in (cursor.fetchmany(size or c.FETCH_MIN_ROWS), ) if rows]
+    return [desc[0] for desc in cursor.description], chain(head, iter_fetch(cursor, size))
@@ -1,11 +1,20 @@
 import os
 import re
+import hashlib
+import shlex
+from collections import namedtuple
+from copy import copy
 from fnmatch import translate as fntranslate
 from urllib.parse import urlparse
 from stat import S_ISDIR
 from shutil import copy2, rmtree
 from .utils import to_list
 from .ssh import SSH
+from .transfer import order_files, transfer_files
+from .manifest import Manifest
+from .delta import block_size, delta, remote_signatures, remote_patch
+from .compress import TRANSPORT, should_compress, put_compressed, get_compressed
+from .constants import SYNC_HASH, SYNC_CHUNK_SIZE, SYNC_RETRIES, DELTA_MIN_SIZE
 
 
 file_match = lambda file, patterns: re.compile(
@@ -13,6 +22,11 @@ file_match = lambda file, patterns: re.compile(
 ).match(os.path.basename(file))
 
 
+# file state in a snapshot, mtime in whole seconds as SFTP reports it
+Entry = namedtuple("Entry", "size mtime")
+Diff = namedtuple("Diff", "new changed deleted unchanged")
+
+
 def sync(source, target, subfolders=True, pattern="*.*", exclude=None, parse_target=None):
     folder_sync = FolderSync(source, target, subfolders, pattern, exclude, parse_target)
     result = folder_sync.sync(parse_target=parse_target)
@@ -29,6 +43,8 @@ class FolderSync:
         pattern="*.*",
         exclude=None,
         parse_target=None,
+        manifest=None,
+        delta=False,
     ):
         self.patterns = to_list(pattern or "")
         self.exclude = to_list(exclude or "")
@@ -43,10 +59,21 @@ class FolderSync:
             else target
         )
         self.parse_target = parse_target
+        self.manifest = Manifest(manifest) if isinstance(manifest, str) else manifest
+        self.is_manifest_file = isinstance(manifest, str)
+        self.delta = delta
+
+    def target_path(self, file, parse_target=None):
+        # relative path of a source file in the target folder
+        parse_target = parse_target or self.parse_target
+        if not parse_target:
+            return file
+        return os.path.join(parse_target(os.path.join(self.source.folder, file)), file)
 
     def sync_file(self, file, parse_target=None):
         source_file = os.path.join(self.source.folder, file)
-        parse_target = parse_target(source_file) if parse_target or self.parse_target else ""
+        parse_target = parse_target or self.parse_target
+        parse_target = parse_target(source_file) if parse_target else ""
         target_file = os.path.join(self.target.folder, parse_target, file)
         self.target.makedir(os.path.dirname(target_file))
         if self.source.sftp and self.target.sftp:
@@ -54,9 +81,17 @@ class FolderSync:
                 fl.prefetch()
                 self.target.sftp.putfo(fl, target_file)
         elif self.source.sftp:
-            self.source.sftp.get(source_file, target_file)
+            if self.compressed(self.source, source_file, self.source.sftp.stat(source_file).st_size):
+                get_compressed(self.source.ssh, self.source.compress, source_file, target_file)
+            else:
+                self.source.sftp.get(source_file, target_file)
         elif self.target.sftp:
-            self.target.sftp.put(source_file, target_file)
+            if self.delta and self.put_delta(source_file, target_file):
+                pass
+            elif self.compressed(self.target, source_file, os.stat(source_file).st_size):
+                put_compressed(self.target.ssh, self.target.compress, source_file, target_file)
+            else:
+                self.target.sftp.put(source_file, target_file)
         else:
             copy2(source_file, target_file)
         if self.source.sftp or self.target.sftp:
@@ -64,20 +99,118 @@ class FolderSync:
             (self.target.sftp.utime if self.target.sftp else os.utime)(target_file, (stat.st_atime, stat.st_mtime))
         return target_file, self.target
 
+    @staticmethod
+    def compressed(folder, file, size):
+        # gzip / zstd streams of the remote folder, per file by size and extension
+        return folder.compress not in (None, TRANSPORT) and should_compress(file, size)
 
-    def diff_list(self):
-        source = self.source.scandir()
-        target = self.target.scandir()
-        return [file for file in source if os.path.basename(file)
-            not in (os.path.basename(f) for f in target)]
+    def put_delta(self, source_file, target_file):
+        # only the changed blocks of a file already on the target, False to send it whole
+        try:
+            target_size = self.target.sftp.stat(target_file).st_size
+        except IOError:
+            return False
+        if target_size < DELTA_MIN_SIZE:
+            return False
+        size = block_size(target_size)
+        signed = remote_signatures(self.target.ssh, target_file, size)
+        if signed is None:
+            return False
+        with open(source_file, "rb") as fl:
+            remote_patch(self.target.ssh, target_file, delta(fl, signed, size), size)
+        return True
 
-    def sync_generator(self, diff_only=True, parse_target=None):
-        for file in self.diff_list() if diff_only else self.source.scandir():
-            yield self.sync_file(file, parse_target)
+    def channel(self):
+        # the same sync on new SFTP channels of the SSH connections, for a transfer worker
+        folder_sync = copy(self)
+        folder_sync.source = self.source.channel()
+        folder_sync.target = self.target.channel()
+        folder_sync.is_manifest_file = False
+        return folder_sync
+
+    def diff(self, checksum=False, parse_target=None, source=None):
+        # both trees are listed once and matched by relative path
+        source = self.source.snapshot(manifest=self.manifest) if source is None else source
+        # the target is not listed when a manifest holds its last synced state
+        use_manifest = bool(self.manifest is not None and len(self.manifest))
+        if use_manifest:
+            target = {file: Entry(*entry) for file, entry in self.manifest.entries().items()}
+        else:
+            target = self.target.snapshot()
+        new, changed, unchanged = [], [], []
+        matched = set()
+        for file, entry in source.items():
+            target_file = file if use_manifest else self.target_path(file, parse_target)
+            target_entry = target.get(target_file)
+            if target_entry is None:
+                new.append(file)
+                continue
+            matched.add(target_file)
+            if entry.size != target_entry.size:
+                changed.append(file)
+            elif entry.mtime == target_entry.mtime:
+                unchanged.append(file)
+            # same size, other mtime: the content decides with checksum
+            elif checksum and self.source.checksum(file) == (
+                (use_manifest and self.manifest.hash(file))
+                or self.target.checksum(self.target_path(file, parse_target))
+            ):
+                unchanged.append(file)
+            else:
+                changed.append(file)
+        deleted = [file for file in target if file not in matched]
+        return Diff(new, changed, deleted, unchanged)
+
+    def diff_list(self, checksum=False, parse_target=None, source=None):
+        diff = self.diff(checksum, parse_target, source)
+        return diff.new + diff.changed
+
+    def sync_generator(
+        self,
+        diff_only=True,
+        parse_target=None,
+        checksum=False,
+        workers=1,
+        order=None,
+        retries=SYNC_RETRIES,
+        progress=None,
+    ):
+        manifest = self.manifest
+        source = self.source.snapshot(manifest=manifest)
+        if diff_only:
+            diff = self.diff(checksum, parse_target, source)
+            files = diff.new + diff.changed
+        else:
+            files = list(source)
+        files = order_files(files, {file: entry.size for file, entry in source.items()}, order)
+        if manifest is not None:
+            # files already in place are recorded too, the manifest covers the whole source
+            if diff_only and not len(manifest):
+                for file in diff.unchanged:
+                    manifest.update(file, *source[file])
+            manifest.remove(file for file in manifest.entries() if file not in source)
+        # results come in completion order with workers
+        for file, result in transfer_files(self, files, parse_target, workers, retries, progress):
+            if manifest is not None:
+                manifest.update(file, *source[file], self.source.checksum(file) if checksum else None)
+            yield result
+        if manifest is not None:
+            manifest.save_dirs()
 
-    def sync(self, diff_only=True, parse_target=None):
+    def sync(
+        self,
+        diff_only=True,
+        parse_target=None,
+        checksum=False,
+        workers=1,
+        order=None,
+        retries=SYNC_RETRIES,
+        progress=None,
+    ):
         result = []
-        for file, folder in self.sync_generator(diff_only, parse_target):
+        for file, folder in self.sync_generator(
+            diff_only, parse_target, checksum, workers, order, retries, progress
+        ):
             result.append((file, folder))
         return result
 
@@ -86,6 +219,8 @@ class FolderSync:
             self.source.close()
         if self.target:
             self.target.close()
+        if self.manifest is not None and self.is_manifest_file:
+            self.manifest.close()
 
     def __exit__(self, exc_type, exc_value, exc_traceback):
         self.close()
@@ -100,39 +235,114 @@ class Folder:
         self.exclude = to_list(exclude or "")
         self.ssh = None
         self.sftp = None
+        self.shared = False
+        self.compress = None
         if url_parse.scheme.lower() in ("ssh", "ftp", "sftp", "scp"):
-            self.ssh = SSH(url).ssh
+            ssh = SSH(url)
+            self.ssh = ssh.ssh
+            self.compress = ssh.compress
             self.sftp = self.ssh.open_sftp()
         # self.makedir(self.folder)
 
-    def scandir(self, subfolder="", full_path=False, pattern=None, exclude=None):
-        result = []
+    def iterdir(self, subfolder="", full_path=False, pattern=None, exclude=None):
+        # (file name, stat) of matching files, the stat comes with the listing
         pattern = to_list((pattern or self.pattern) or "")
         exclude = to_list((exclude or self.exclude) or "")
         folder = os.path.join(self.folder, subfolder)
         scandir_func = self.sftp.listdir_attr if self.sftp else os.scandir
         for file in scandir_func(folder):
-            st_mode = file.st_mode if self.sftp else file.stat().st_mode
+            stat = file if self.sftp else file.stat()
             filename = os.path.join(
                 folder if full_path else subfolder,
                 file.filename if self.sftp else file.name,
             )
-            if self.subfolders and S_ISDIR(st_mode):
-                result.extend(
-                    self.scandir(filename, pattern=pattern, exclude=exclude)
-                )
+            if self.subfolders and S_ISDIR(stat.st_mode):
+                yield from self.iterdir(filename, pattern=pattern, exclude=exclude)
             elif file_match(filename, pattern) and not file_match(
                 filename, exclude
             ):
-                result.append(filename)
-        return result
+                yield filename, stat
+
+    def scandir(self, subfolder="", full_path=False, pattern=None, exclude=None):
+        return [
+            filename
+            for filename, _ in self.iterdir(subfolder, full_path, pattern, exclude)
+        ]
+
+    def snapshot(self, subfolder="", pattern=None, exclude=None, manifest=None):
+        if manifest is not None:
+            manifest.dirs.clear()
+            return dict(self.walk(subfolder, pattern, exclude, manifest))
+        return {
+            filename: Entry(stat.st_size, int(stat.st_mtime))
+            for filename, stat in self.iterdir(subfolder, False, pattern, exclude)
+        }
+
+    def walk(self, subfolder="", pattern=None, exclude=None, manifest=None, mtime=None):
+        # (file name, Entry), folders with the mtime of the last synced run are not listed again
+        pattern = to_list((pattern or self.pattern) or "")
+        exclude = to_list((exclude or self.exclude) or "")
+        folder = os.path.join(self.folder, subfolder)
+        if mtime is None:
+            try:
+                mtime = int((self.sftp.stat if self.sftp else os.stat)(folder).st_mtime)
+            except OSError:
+                return
+        manifest.dirs[subfolder] = mtime
+        if manifest.skipping and manifest.dir_mtime(subfolder) == mtime:
+            # no file added, removed or renamed here since, only subfolders are checked
+            for filename, entry in manifest.folder_entries(subfolder).items():
+                yield filename, Entry(*entry)
+            if self.subfolders:
+                for filename in manifest.subfolders(subfolder):
+                    yield from self.walk(filename, pattern, exclude, manifest)
+            return
+        scandir_func = self.sftp.listdir_attr if self.sftp else os.scandir
+        for file in scandir_func(folder):
+            stat = file if self.sftp else file.stat()
+            filename = os.path.join(subfolder, file.filename if self.sftp else file.name)
+            if self.subfolders and S_ISDIR(stat.st_mode):
+                yield from self.walk(filename, pattern, exclude, manifest, int(stat.st_mtime))
+            elif file_match(filename, pattern) and not file_match(
+                filename, exclude
+            ):
+                yield filename, Entry(stat.st_size, int(stat.st_mtime))
+
+    def checksum(self, file, method=SYNC_HASH):
+        path = os.path.join(self.folder, file)
+        if self.ssh:
+            # hashed on the remote host, read over SFTP when the command is missing
+            _, stdout, _ = self.ssh.exec_command(f"{method}sum -- {shlex.quote(path)}")
+            output = stdout.read().split()
+            if stdout.channel.recv_exit_status() == 0 and output:
+                return output[0].decode()
+        hash_method = getattr(hashlib, method)()
+        with (self.sftp.file if self.sftp else open)(path, "rb") as fl:
+            while chunk := fl.read(SYNC_CHUNK_SIZE):
+                hash_method.update(chunk)
+        return hash_method.hexdigest()
+
+    def channel(self):
+        # a copy on a new SFTP channel of the same SSH connection
+        folder = copy(self)
+        if self.ssh:
+            folder.sftp = self.ssh.open_sftp()
+            folder.shared = True
+        return folder
 
     def makedir(self, dir):
         if self.sftp:
             try:
                 self.sftp.stat(dir)
             except IOError:
-                self.sftp.mkdir(dir)
+                parent = os.path.dirname(dir)
+                if parent and parent != dir:
+                    self.makedir(parent)
+                try:
+                    self.sftp.mkdir(dir)
+                except IOError:
+                    # created meanwhile by another transfer worker
+                    self.sftp.stat(dir)
         else:
             os.makedirs(dir, exist_ok=True)
 
@@ -162,7 +372,8 @@ class Folder:
         if self.ssh:
             if self.sftp:
                 self.sftp.close()
-            self.ssh.close()
+            if not self.shared:
+                self.ssh.close()
 
     def __exit__(self, exc_type, exc_value, exc_traceback):
         self.close()
@@ -0,0 +1,156 @@
+import os
+import json
+import socket
+import weakref
+from collections.abc import Iterable, Iterator
+from itertools import chain, islice
+from math import isfinite
+from .ssh import SSH
+from .utils import close_all
+from .constants import BATCH_SIZE
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def finite(value):
+    return None if type(value) is float and not isfinite(value) else value
+
+
+def to_serializable(value):
+    # dates as ISO 8601 like orjson, Decimal and other types as text
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
+if orjson:
+    def dumps(value) -> bytes:
+        return orjson.dumps(value, default=to_serializable)
+    loads = orjson.loads
+else:
+    # NaN / Infinity are not JSON, written as null like orjson
+    _encoder = json.JSONEncoder(ensure_ascii=False, default=to_serializable, allow_nan=False)
+
+    def dumps(value) -> bytes:
+        return _encoder.encode(finite(value)).encode()
+    loads = json.loads
+
+
+def open_binary(file_name: str, mode: str="rb", ssh=None):
+    if ssh:
+        sftp_file = ssh.sftp.file(os.path.join(ssh.path, file_name), mode)
+        if "r" in mode:
+            sftp_file.prefetch()
+        else:
+            sftp_file.set_pipelined(True)
+        return sftp_file
+    return open(file_name, mode)
+
+
+def encode_rows(rows: Iterable, keys: list[bytes]) -> list[bytes]:
+    # one object per row from the encoded keys and values, no dict per row
+    return [b"{" + b",".join(key + dumps(value) for key, value in zip(keys, row)) + b"}" for row in rows]
+
+
+def write_json(
+    file: str|object,
+    batches: Iterable[list],
+    columns: list,
+    lines: bool=True,
+    ssh=None,
+) -> str|object:
+    """Writes row batches as JSON Lines, or a JSON array with lines=False.
+
+    file is a file name, a binary file object or a connected socket,
+    every batch is encoded and written at once.
+    """
+    keys = [dumps(str(column)) + b":" for column in columns]
+    is_ssh_url = isinstance(ssh, str)
+    if is_ssh_url:
+        ssh = SSH(ssh)
+    is_name = isinstance(file, str)
+    if is_name:
+        output = open_binary(file, "wb", ssh)
+    elif isinstance(file, socket.socket):
+        output = file.makefile("wb")
+    else:
+        output = file
+    try:
+        separator = b"\n" if lines else b",\n"
+        first = True
+        if not lines:
+            output.write(b"[\n")
+        for rows in batches:
+            objects = encode_rows(rows, keys)
+            if not objects:
+                continue
+            if lines:
+                output.write(separator.join(objects) + separator)
+            else:
+                # the array separator goes before every batch but the first
+                output.write((b"" if first else separator) + separator.join(objects))
+            first = False
+        if not lines:
+            output.write(b"\n]\n")
+        output.flush()
+    finally:
+        if is_name or output is not file:
+            output.close()
+        if is_ssh_url:
+            ssh.close()
+    return file
+
+
+class NDJSONReader:
+    """Reads JSON Lines, or a JSON array (read at once), in batches of rows.
+
+    The columns are given or taken from the first object, missing keys
+    are None and keys that are not columns are ignored.
+    """
+    columns: list
+
+    def __init__(
+        self,
+        file: str|object,
+        columns: list=None,
+        ssh=None,
+        batch_size: int=BATCH_SIZE,
+    ) -> None:
+        self.ssh = SSH(ssh) if isinstance(ssh, str) else ssh
+        self.is_ssh_url = isinstance(ssh, str)
+        self.batch_size = batch_size
+        self.is_name = isinstance(file, str)
+        try:
+            self.file = open_binary(file, "rb", self.ssh) if self.is_name else file
+        except Exception:
+            close_all(self.ssh if self.is_ssh_url else None)
+            raise
+        # a reader that is never iterated to the end closes its file once collected
+        self.finalizer = weakref.finalize(self, close_all, self.file if self.is_name else None, self.ssh if self.is_ssh_url else None)
+        try:
+            lines = (line for line in self.file if line.strip())
+            head = next(lines, None)
+            if head is not None and head.lstrip()[:1] in (b"[", "["):
+                # a JSON array, the whole document is parsed
+                self.items = iter(loads(head + head[:0].join(lines)))
+            else:
+                self.items = (loads(line) for line in chain([head] if head is not None else [], lines))
+            first = list(islice(self.items, 1))
+            self.items = chain(first, self.items)
+            self.columns = list(columns or (first[0] if first and isinstance(first[0], dict) else []))
+        except Exception:
+            self.close()
+            raise
+
+    def __iter__(self) -> Iterator[list]:
+        try:
+            # objects by column name, arrays as positional rows
+            row = lambda item: tuple(item.get(column) for column in self.columns) if isinstance(item, dict) else tuple(item)
+            while rows := [row(item) for item in islice(self.items, self.batch_size)]:
+                yield rows
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        self.finalizer()
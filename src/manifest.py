@@ -0,0 +1,106 @@
+import os
+import sqlite3
+from collections.abc import Iterable
+from .constants import MANIFEST_COMMIT_ROWS, MANIFEST_RESCAN_RUNS
+
+MANIFEST_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, folder TEXT, size INTEGER, mtime INTEGER, hash TEXT);
+CREATE INDEX IF NOT EXISTS files_folder ON files (folder);
+CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY, parent TEXT, mtime INTEGER);
+"""
+
+
+class Manifest:
+    """Last synced state of a FolderSync source in a SQLite file.
+
+    files: size, mtime and optional hash of every synced file by relative path.
+    dirs: directory mtimes of the last complete run, a directory with the same
+    mtime is not listed again and its files are taken from the manifest, only
+    its subfolders are stat'ed for their own mtime.
+    Limitation: a file rewritten in place does not change the directory mtime,
+    it is picked up by the full listing of every rescan-th run (rescan=0 never),
+    skip_dirs=False lists every directory on every run.
+    """
+    file_name: str
+    skip_dirs: bool
+    rescan: int
+
+    def __init__(self, file_name: str, skip_dirs: bool=True, rescan: int=MANIFEST_RESCAN_RUNS) -> None:
+        self.file_name = file_name
+        self.skip_dirs = skip_dirs
+        self.rescan = rescan
+        self.connection = sqlite3.connect(file_name, check_same_thread=False)
+        self.connection.executescript(MANIFEST_SCHEMA)
+        # completed runs, counted in the SQLite user_version
+        self.runs = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        self.pending = 0
+        self.dirs = {}
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def entries(self) -> dict:
+        return {path: (size, mtime) for path, size, mtime in self.connection.execute("SELECT path, size, mtime FROM files")}
+
+    def folder_entries(self, folder: str) -> dict:
+        return {
+            path: (size, mtime)
+            for path, size, mtime in self.connection.execute("SELECT path, size, mtime FROM files WHERE folder = ?", (folder, ))
+        }
+
+    def hash(self, path: str) -> str|None:
+        row = self.connection.execute("SELECT hash FROM files WHERE path = ?", (path, )).fetchone()
+        return row[0] if row else None
+
+    @property
+    def skipping(self) -> bool:
+        # unchanged directories are skipped, except on the full rescan runs
+        return self.skip_dirs and not (self.rescan and self.runs % self.rescan == self.rescan - 1)
+
+    def dir_mtime(self, path: str) -> int|None:
+        row = self.connection.execute("SELECT mtime FROM dirs WHERE path = ?", (path, )).fetchone()
+        return row[0] if row else None
+
+    def subfolders(self, path: str) -> list:
+        return [row[0] for row in self.connection.execute("SELECT path FROM dirs WHERE parent = ? AND path <> ?", (path, path))]
+
+    def update(self, path: str, size: int, mtime: int, hash: str=None) -> None:
+        self.connection.execute(
+            "INSERT OR REPLACE INTO files (path, folder, size, mtime, hash) VALUES (?, ?, ?, ?, ?)",
+            (path, os.path.dirname(path), size, mtime, hash),
+        )
+        self.pending += 1
+        if self.pending >= MANIFEST_COMMIT_ROWS:
+            self.commit()
+
+    def remove(self, paths: Iterable[str]) -> None:
+        self.connection.executemany("DELETE FROM files WHERE path = ?", ((path, ) for path in paths))
+
+    def save_dirs(self, dirs: dict=None) -> None:
+        # directory mtimes seen by the last listing, saved once all its files are synced
+        dirs = self.dirs if dirs is None else dirs
+        self.connection.execute("DELETE FROM dirs")
+        self.connection.executemany(
+            "INSERT INTO dirs (path, parent, mtime) VALUES (?, ?, ?)",
+            ((path, os.path.dirname(path), mtime) for path, mtime in dirs.items()),
+        )
+        self.runs += 1
+        self.connection.execute(f"PRAGMA user_version = {self.runs}")
+        self.commit()
+
+    def commit(self) -> None:
+        self.connection.commit()
+        self.pending = 0
+
+    def close(self) -> None:
+        self.commit()
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"Manifest {self.file_name}"
@@ -0,0 +1,194 @@
+from collections.abc import Iterator
+from queue import Queue, Empty, Full
+from threading import Event, Thread
+from . import constants as c
+from .pool import get_database
+from .fetch import iter_result, prefetch
+
+
+PARTITION = "{partition}"
+_DONE = object()
+
+
+def bind(database, sql_text: str, sql_params, values: dict):
+    # named bounds are merged, positional bounds go in at the {partition} marker
+    if database.placeholder == c.NAMED:
+        return {**(sql_params or {}), **values}
+    params = list(sql_params or [])
+    position = sql_text.count(database.placeholder, 0, sql_text.index(PARTITION)) if PARTITION in sql_text else len(params)
+    return [*params[:position], *values.values(), *params[position:]]
+
+
+def partition_sql(sql_text: str, predicate: str) -> str:
+    # "... WHERE {partition}" in the query, otherwise the query is wrapped
+    if PARTITION in sql_text:
+        return sql_text.replace(PARTITION, predicate)
+    return f"SELECT * FROM ({sql_text}) q WHERE {predicate}"
+
+
+def column_partitions(database, sql_text: str, sql_params, column: str, partitions: int) -> list[tuple[str, object]]:
+    cursor = database.connection.cursor()
+    try:
+        cursor.execute(f"SELECT MIN({column}), MAX({column}) FROM ({sql_text.replace(PARTITION, '1=1')}) q", sql_params)
+        low, high = cursor.fetchone()
+    finally:
+        cursor.close()
+    if low is None:
+        return [(sql_text.replace(PARTITION, "1=1"), sql_params)]
+    try:
+        if isinstance(low, int) and isinstance(high, int):
+            bounds = sorted({low + (high - low + 1) * i // partitions for i in range(partitions)})
+        else:
+            bounds = sorted({low + (high - low) * i / partitions for i in range(partitions)})
+    except TypeError:
+        raise ValueError(f"Partition column '{column}' must be numeric or a date, got {type(low).__name__}.")
+    lower, upper = database.placeholder.format("part_lo"), database.placeholder.format("part_hi")
+    queries = []
+    for i, bound in enumerate(bounds):
+        if i + 1 < len(bounds):
+            predicate = f"{column} >= {lower} AND {column} < {upper}"
+            values = {"part_lo": bound, "part_hi": bounds[i + 1]}
+        else:
+            predicate, values = f"{column} >= {lower}", {"part_lo": bound}
+        queries.append((partition_sql(sql_text, predicate), bind(database, sql_text, sql_params, values)))
+    queries.append((partition_sql(sql_text, f"{column} IS NULL"), sql_params))
+    return queries
+
+
+def rowid_partitions(database, sql_text: str, sql_params, partitions: int) -> list[tuple[str, object]]:
+    # sql_text is a table name or a query over one table with a {partition} marker
+    table = sql_text.strip() if len(sql_text.split()) == 1 else None
+    if table:
+        sql_text = f"SELECT * FROM {table} WHERE {PARTITION}"
+    elif PARTITION not in sql_text:
+        raise ValueError(f"ROWID partitions need a table name or a query with a {PARTITION} marker.")
+    if database.engine == c.ORACLE:
+        predicates = [f"MOD(DBMS_ROWID.ROWID_BLOCK_NUMBER(ROWID), {partitions}) = {i}" for i in range(partitions)]
+    elif database.engine == c.POSTGRESQL and table:
+        # ctid ranges by heap block, read with TID range scans
+        cursor = database.connection.cursor()
+        try:
+            cursor.execute(f"SELECT pg_relation_size('{table}') / current_setting('block_size')::int")
+            blocks = cursor.fetchone()[0]
+        finally:
+            cursor.close()
+        bounds = sorted({blocks * i // partitions for i in range(partitions)})
+        predicates = [
+            f"ctid >= '({bound},0)'::tid" + (f" AND ctid < '({bounds[i + 1]},0)'::tid" if i + 1 < len(bounds) else "")
+            for i, bound in enumerate(bounds)
+        ]
+    elif database.engine == c.POSTGRESQL:
+        # mod() instead of %, a literal % breaks pyformat drivers
+        predicates = [f"mod((ctid::text::point)[0]::bigint, {partitions}) = {i}" for i in range(partitions)]
+    else:
+        raise ValueError(f"ROWID partitions are not supported for {database.engine.upper()}.")
+    return [(partition_sql(sql_text, predicate), sql_params) for predicate in predicates]
+
+
+def partition_queries(database, sql_text: str, sql_params, partition_by: str|list, partitions: int) -> list[tuple[str, object]]:
+    """Split one query into slices by a column range, ROWID/ctid or a list of predicates."""
+    if not partition_by:
+        raise ValueError("partition_by needs a column, ROWID or a list of predicates.")
+    if isinstance(partition_by, (list, tuple)):
+        return [(partition_sql(sql_text, f"({predicate})"), sql_params) for predicate in partition_by]
+    if partition_by.lower() == c.ROWID:
+        return rowid_partitions(database, sql_text, sql_params, partitions)
+    return column_partitions(database, sql_text, sql_params, partition_by, partitions)
+
+
+class PartitionReader:
+    """Runs query slices on separate connections, yields the batches in slice order.
+
+    Every slice has a bounded queue, so streaming keeps at most
+    queue_size batches per running slice in memory.
+    """
+    columns: list
+
+    def __init__(
+        self,
+        url: str,
+        queries: list[tuple[str, object]],
+        workers: int=None,
+        batch_size: int=None,
+        queue_size: int=c.PARTITION_QUEUE_SIZE,
+        server_side: bool=False,
+    ) -> None:
+        if not queries:
+            raise ValueError("PartitionReader needs at least one query.")
+        self.url = url
+        self.batch_size = batch_size
+        self.server_side = server_side
+        self.queues = [Queue(queue_size) for _ in queries]
+        self.stop = Event()
+        self.tasks = Queue()
+        for queue, (sql_text, sql_params) in zip(self.queues, queries):
+            self.tasks.put((queue, sql_text, sql_params))
+        # daemon threads, an abandoned stream does not block the interpreter exit
+        self.threads = [Thread(target=self.work, daemon=True) for _ in range(min(workers or len(queries), len(queries)))]
+        for thread in self.threads:
+            thread.start()
+        try:
+            self.columns = self.get(self.queues[0])
+        except Exception:
+            self.close()
+            raise
+
+    def put(self, queue: Queue, item) -> bool:
+        while not self.stop.is_set():
+            try:
+                queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    def work(self) -> None:
+        # slices are taken in order, so the slice being consumed always has a thread
+        while not self.stop.is_set():
+            try:
+                task = self.tasks.get_nowait()
+            except Empty:
+                break
+            self.extract(*task)
+
+    def extract(self, queue: Queue, sql_text: str, sql_params) -> None:
+        try:
+            database = get_database(self.url)
+            try:
+                cursor = database.server_cursor() if self.server_side else database.connection.cursor()
+                prefetch(cursor)
+                cursor.execute(sql_text, sql_params)
+                columns, batches = iter_result(cursor, self.batch_size)
+                if not self.put(queue, columns):
+                    return
+                for rows in batches:
+                    if not self.put(queue, rows):
+                        break
+                cursor.close()
+            finally:
+                database.close()
+            self.put(queue, _DONE)
+        except Exception as e:
+            self.put(queue, e)
+
+    @staticmethod
+    def get(queue: Queue):
+        item = queue.get()
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    def __iter__(self) -> Iterator[list]:
+        try:
+            for i, queue in enumerate(self.queues):
+                if i:
+                    self.get(queue)
+                while (rows := self.get(queue)) is not _DONE:
+                    yield rows
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        self.stop.set()
+        for thread in self.threads:
+            thread.join()
@@ -0,0 +1,87 @@
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from itertools import repeat
+from typing import Self
+from .columnar import ColumnStore, to_column
+
+# output column kinds: a source column, a constant value or a row number
+SOURCE = "source"
+CONSTANT = "constant"
+SEQUENCE = "sequence"
+
+
+class Plan:
+    """Column transforms of a lazy Dataset.
+
+    Every output column is a source column, a constant or a row number with
+    the conversions applied to it, so a chain of transforms runs in one pass
+    per batch when the data is consumed.
+    """
+    outputs: list[tuple]
+
+    def __init__(self, width: int=0) -> None:
+        self.outputs = [(SOURCE, i, ()) for i in range(width)]
+
+    def copy(self) -> Self:
+        plan = Plan()
+        plan.outputs = list(self.outputs)
+        return plan
+
+    def select(self, indexes: Sequence[int]) -> Self:
+        plan = Plan()
+        plan.outputs = [self.outputs[idx] for idx in indexes]
+        return plan
+
+    def convert(self, indexes: Sequence[int], to_type: Callable) -> None:
+        for idx in indexes:
+            kind, value, converters = self.outputs[idx]
+            self.outputs[idx] = (kind, value, (*converters, to_type))
+
+    def remove(self, indexes: Sequence[int]) -> None:
+        for idx in sorted(indexes, reverse=True):
+            self.outputs.pop(idx)
+
+    def append(self, value) -> None:
+        self.outputs.append((CONSTANT, value, ()))
+
+    def increment(self, indexes: Sequence[int], start: int) -> None:
+        for idx in indexes:
+            self.outputs[idx] = (SEQUENCE, start, ())
+
+    def columns(self, source: Sequence[Sequence], length: int, offset: int=0) -> list[Iterable]:
+        """Output columns of one chunk, source columns are read once and only if used."""
+        result = []
+        for kind, value, converters in self.outputs:
+            if kind == CONSTANT:
+                for to_type in converters:
+                    value = to_type(value)
+                result.append(repeat(value, length))
+                continue
+            values = source[value] if kind == SOURCE else range(offset + value, offset + value + length)
+            for to_type in converters:
+                values = map(to_type, values)
+            result.append(values)
+        return result
+
+    def apply(self, store: ColumnStore) -> ColumnStore:
+        return ColumnStore([to_column(values) for values in self.columns(store.columns, store.length)], store.length)
+
+    def batches(self, source: ColumnStore|Iterable[list], size: int) -> Iterator[list]:
+        # chunks of an in-memory store or the row batches of a stream
+        offset = 0
+        if isinstance(source, ColumnStore):
+            used = {value for kind, value, _ in self.outputs if kind == SOURCE}
+            for offset in range(0, source.length, size):
+                length = min(size, source.length - offset)
+                columns = [column[offset:offset + size] if i in used else None for i, column in enumerate(source.columns)]
+                yield list(zip(*self.columns(columns, length, offset))) if self.outputs else [()] * length
+            return
+        for rows in source:
+            columns = list(zip(*rows))
+            yield list(zip(*self.columns(columns, len(rows), offset))) if self.outputs else [()] * len(rows)
+            offset += len(rows)
+
+    def __len__(self) -> int:
+        return len(self.outputs)
+
+    def __repr__(self) -> str:
+        return f"Plan ({', '.join(kind if not converters else f'{kind}+{len(converters)}' for kind, _, converters in self.outputs)})"
@@ -0,0 +1,231 @@
+from collections import deque
+from copy import copy
+from threading import Condition, Lock
+from time import monotonic
+from urllib.parse import urlsplit, parse_qsl
+from . import constants as c
+from .database import Database
+from .utils import boolify
+
+
+class ConnectionPool:
+    url: str
+    min_size: int
+    max_size: int
+    idle_timeout: float
+    timeout: float
+    health_check: bool
+
+    def __init__(
+        self,
+        url: str,
+        min_size: int=0,
+        max_size: int=10,
+        idle_timeout: float=300,
+        timeout: float=30,
+        health_check: bool=True,
+    ) -> None:
+        if max_size < 1 or min_size > max_size:
+            raise ValueError(f"Invalid pool size (min: {min_size}, max: {max_size}).")
+        self.url = url
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.health_check = health_check
+        self._idle: deque[tuple[Database, float]] = deque()
+        # ids of the checked out connections, a second close() is not a second release
+        self._used: set[int] = set()
+        self._size = 0
+        self._closed = False
+        self._template: Database = None
+        self._condition = Condition(Lock())
+        for _ in range(min_size):
+            self._size += 1
+            self._idle.append((self._open(), monotonic()))
+
+    def _open(self) -> Database:
+        # URL parsing, library import and connect params are resolved once per pool,
+        # called outside the lock on a slot reserved in _size
+        template = self._template
+        if template is None:
+            database = self._template = Database(self.url)
+        else:
+            database = copy(template)
+            database._catalog = None
+            database.connect(database.params)
+        database.pool = self
+        return database
+
+    def _remove(self, database: Database) -> Database:
+        # frees the slot under the lock, the connection is closed after it by _close
+        self._size -= 1
+        database.pool = None
+        return database
+
+    @staticmethod
+    def _close(databases: list[Database]) -> None:
+        for database in databases:
+            try:
+                database.close()
+            except Exception:
+                pass
+
+    def _discard(self, database: Database) -> None:
+        with self._condition:
+            self._remove(database)
+            self._condition.notify()
+        self._close([database])
+
+    def _is_alive(self, database: Database) -> bool:
+        sql = c.PING_SQL.get(database.engine)
+        if not (self.health_check and sql):
+            return True
+        try:
+            cursor = database.connection.cursor()
+            cursor.execute(sql)
+            cursor.fetchall()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _expire(self) -> list[Database]:
+        # idle connections above min_size, oldest first, removed under the lock
+        deadline = monotonic() - self.idle_timeout
+        expired = []
+        while self._idle and self._size > self.min_size and self._idle[0][1] < deadline:
+            expired.append(self._remove(self._idle.popleft()[0]))
+        return expired
+
+    def acquire(self) -> Database:
+        # an idle connection is taken or a slot reserved under the lock,
+        # the connect, ping and close run outside of it
+        end_time = monotonic() + self.timeout
+        while True:
+            with self._condition:
+                while True:
+                    if self._closed:
+                        raise RuntimeError(f"Connection pool is closed: {self.url}")
+                    expired = self._expire()
+                    if self._idle:
+                        database, _ = self._idle.pop()
+                        self._used.add(id(database))
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        database = None
+                        break
+                    remaining = end_time - monotonic()
+                    if remaining <= 0 or not self._condition.wait(remaining):
+                        raise TimeoutError(f"No free connection in pool after {self.timeout}s: {self.url}")
+            self._close(expired)
+            if database is None:
+                try:
+                    database = self._open()
+                except Exception:
+                    with self._condition:
+                        self._size -= 1
+                        self._condition.notify()
+                    raise
+                with self._condition:
+                    self._used.add(id(database))
+                return database
+            if self._is_alive(database):
+                return database
+            with self._condition:
+                self._used.discard(id(database))
+            self._discard(database)
+
+    def release(self, database: Database) -> None:
+        with self._condition:
+            if id(database) not in self._used:
+                # closed twice, or not checked out from this pool
+                return
+            self._used.discard(id(database))
+            closed = self._closed
+        if closed:
+            self._discard(database)
+            return
+        try:
+            database.rollback()
+            database.cursor = None
+            database.cursor = database.connection.cursor()
+        except Exception:
+            self._discard(database)
+            return
+        with self._condition:
+            if self._closed:
+                expired = [self._remove(database)]
+            else:
+                self._idle.append((database, monotonic()))
+                expired = self._expire()
+            self._condition.notify()
+        self._close(expired)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def idle(self) -> int:
+        return len(self._idle)
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            idle = [self._remove(database) for database, _ in self._idle]
+            self._idle.clear()
+            self._condition.notify_all()
+        self._close(idle)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"ConnectionPool ({self._size} connections, {len(self._idle)} idle, max {self.max_size})"
+
+
+# URL query parameter -> (ConnectionPool argument, type)
+POOL_OPTIONS = {
+    c.POOL_MIN: ("min_size", int),
+    c.POOL_MAX: ("max_size", int),
+    c.POOL_IDLE: ("idle_timeout", float),
+    c.POOL_TIMEOUT: ("timeout", float),
+    c.POOL_CHECK: ("health_check", boolify),
+}
+
+POOLS: dict[str, ConnectionPool] = {}
+_pools_lock = Lock()
+
+
+def get_pool(url: str, **kwargs) -> ConnectionPool:
+    # one pool per URL, options from kwargs or the URL query (pool_min, pool_max, ...)
+    with _pools_lock:
+        pool = POOLS.get(url)
+        if pool is None or pool._closed:
+            query = {item[0].lower(): item[1] for item in parse_qsl(urlsplit(url).query)}
+            options = {param: cast(query[key]) for key, (param, cast) in POOL_OPTIONS.items() if key in query}
+            options.update(kwargs)
+            pool = POOLS[url] = ConnectionPool(url, **options)
+        return pool
+
+
+def get_database(url: str) -> Database:
+    # pooled connection when the URL has ?pool=1, close() returns it to the pool
+    if url in POOLS:
+        return get_pool(url).acquire()
+    query = {item[0].lower(): item[1] for item in parse_qsl(urlsplit(url).query)}
+    if boolify(query.get(c.POOL, False)):
+        return get_pool(url).acquire()
+    return Database(url)
+
+
+def close_pools() -> None:
+    with _pools_lock:
+        for pool in POOLS.values():
+            pool.close()
+        POOLS.clear()
@@ -0,0 +1,205 @@
+import re
+import ast
+import heapq
+from collections.abc import Iterable, Sequence
+from itertools import compress
+from .columnar import ColumnStore, np, numpy_view
+from .utils import to_list
+
+
+FUNCTIONS = {
+    "abs": abs,
+    "round": round,
+    "len": len,
+    "str": str,
+    "int": int,
+    "float": float,
+    "bool": bool,
+    "min": min,
+    "max": max,
+}
+
+ALLOWED_NODES = (
+    ast.Expression, ast.BoolOp, ast.BinOp, ast.UnaryOp, ast.Compare, ast.IfExp, ast.Call,
+    ast.Attribute, ast.Name, ast.Load, ast.Constant, ast.Tuple, ast.List, ast.Set,
+    ast.And, ast.Or, ast.Not, ast.USub, ast.UAdd, ast.Invert,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow, ast.BitAnd, ast.BitOr, ast.BitXor,
+    ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Is, ast.IsNot, ast.In, ast.NotIn,
+)
+# nodes numpy can evaluate over whole typed columns
+VECTOR_NODES = (
+    ast.Expression, ast.BoolOp, ast.BinOp, ast.UnaryOp, ast.Compare, ast.Name, ast.Load, ast.Constant,
+    ast.And, ast.Or, ast.Not, ast.USub, ast.UAdd, ast.Invert,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow, ast.BitAnd, ast.BitOr, ast.BitXor,
+    ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+)
+
+QUOTED_COLUMN = re.compile(r"`([^`]+)`")
+
+
+def is_boolean(node) -> bool:
+    # comparisons and their and / or / not, where & | ~ give the same truth values
+    if isinstance(node, ast.Compare):
+        return True
+    if isinstance(node, ast.BoolOp):
+        return all(map(is_boolean, node.values))
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        return is_boolean(node.operand)
+    return False
+
+
+def vectorizable(tree) -> bool:
+    # and / or return an operand and not on a number is not ~, only boolean operands are rewritten
+    for node in ast.walk(tree):
+        if not isinstance(node, VECTOR_NODES):
+            return False
+        if isinstance(node, (ast.BoolOp, ast.UnaryOp)) and isinstance(getattr(node, "op", None), (ast.And, ast.Or, ast.Not)) and not is_boolean(node):
+            return False
+    return True
+
+
+class _Vectorize(ast.NodeTransformer):
+    # and / or / not of comparisons / chained comparisons -> elementwise numpy operators
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        op = ast.BitAnd() if isinstance(node.op, ast.And) else ast.BitOr()
+        result = node.values[0]
+        for value in node.values[1:]:
+            result = ast.BinOp(result, op, value)
+        return result
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        return ast.UnaryOp(ast.Invert(), node.operand) if isinstance(node.op, ast.Not) else node
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        left, result = node.left, None
+        for op, right in zip(node.ops, node.comparators):
+            compare = ast.Compare(left, [op], [right])
+            result = compare if result is None else ast.BinOp(result, ast.BitAnd(), compare)
+            left = right
+        return result
+
+
+class Expression:
+    text: str
+    index: list
+
+    def __init__(self, text: str, columns_index) -> None:
+        self.text = text
+        quoted = {}
+        def quote(match):
+            quoted.setdefault(match.group(1), f"_q{len(quoted)}")
+            return quoted[match.group(1)]
+        tree = ast.parse(QUOTED_COLUMN.sub(quote, text).strip(), mode="eval")
+        names = {alias: name for name, alias in quoted.items()}
+        self.index = []
+        for node in ast.walk(tree):
+            if not isinstance(node, ALLOWED_NODES):
+                raise ValueError(f"Unsupported expression '{type(node).__name__}' in: {text}")
+            if isinstance(node, ast.Attribute) and (node.attr.startswith("_") or node.attr in ("format", "format_map")):
+                raise ValueError(f"Private attribute '{node.attr}' in: {text}")
+            if isinstance(node, ast.Name):
+                if node.id in FUNCTIONS and node.id not in names:
+                    continue
+                # resolve column names through Dataset.columns_index
+                idx = columns_index(names.get(node.id, node.id))[0]
+                if idx not in self.index:
+                    self.index.append(idx)
+                node.id = f"_{self.index.index(idx)}"
+        args = ", ".join(f"_{i}" for i in range(len(self.index)))
+        source = ast.unparse(tree)
+        if not self.index:
+            source = f"lambda _n: [{source} for _ in range(_n)]"
+        elif len(self.index) == 1:
+            source = f"lambda _0: [{source} for _0 in _0]"
+        else:
+            source = f"lambda {args}: [{source} for {args} in zip({args})]"
+        # compiled once, evaluated over whole columns
+        self._rows = eval(compile(source, "<expression>", "eval"), {"__builtins__": {}, "zip": zip, "range": range, **FUNCTIONS})
+        self._vector = None
+        # int64 arithmetic wraps on overflow where python ints grow, it runs row by row
+        self._arithmetic = any(
+            isinstance(node, ast.BinOp) and not isinstance(node.op, (ast.BitAnd, ast.BitOr, ast.BitXor))
+            or isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub)
+            for node in ast.walk(tree)
+        )
+        if np is not None and self.index and vectorizable(tree):
+            vector_tree = ast.fix_missing_locations(_Vectorize().visit(tree))
+            self._vector = eval(compile(f"lambda {args}: {ast.unparse(vector_tree)}", "<expression>", "eval"), {"__builtins__": {}})
+
+    def evaluate(self, store: ColumnStore) -> Sequence:
+        if self._vector is not None:
+            views = [numpy_view(store.columns[idx]) for idx in self.index]
+            if all(view is not None for view in views) and not (self._arithmetic and any(view.dtype.kind == "i" for view in views)):
+                try:
+                    # division by zero, overflow and negative integer powers are left to python semantics
+                    with np.errstate(divide="raise", invalid="raise", over="raise"):
+                        return np.broadcast_to(self._vector(*views), (store.length, ))
+                except (FloatingPointError, OverflowError, ValueError):
+                    pass
+        if not self.index:
+            return self._rows(store.length)
+        return self._rows(*(store.columns[idx] for idx in self.index))
+
+    def mask(self, store: ColumnStore) -> list:
+        values = self.evaluate(store)
+        if np is not None and isinstance(values, np.ndarray):
+            return np.flatnonzero(values).tolist()
+        return list(compress(range(store.length), values))
+
+    def __repr__(self) -> str:
+        return f"Expression ({self.text})"
+
+
+class _Descending:
+    __slots__ = ("value", )
+
+    def __init__(self, value) -> None:
+        self.value = value
+
+    def __lt__(self, other) -> bool:
+        return other.value < self.value
+
+    def __eq__(self, other) -> bool:
+        return self.value == other.value
+
+
+def sort_keys(order_by, columns_index) -> list[tuple[int, bool]]:
+    # "a, b desc" / ["a", "-b"] -> [(index_a, False), (index_b, True)]
+    result = []
+    for item in to_list(order_by):
+        item = str(item).strip()
+        descending = item.startswith("-")
+        item = item.lstrip("-")
+        parts = item.rsplit(None, 1)
+        if len(parts) == 2 and parts[1].lower() in ("asc", "desc"):
+            item, descending = parts[0], parts[1].lower() == "desc"
+        result.append((columns_index(item)[0], descending))
+    return result
+
+
+def null_key(column: Sequence) -> Sequence:
+    # None sorts last ascending and first descending
+    if numpy_view(column) is not None or None not in column:
+        return column
+    return [(value is None, value) for value in column]
+
+
+def sort_positions(store: ColumnStore, keys: list[tuple[int, bool]]) -> list:
+    views = [numpy_view(store.columns[idx]) for idx, _ in keys]
+    if np is not None and all(view is not None for view in views):
+        # lexsort is stable and takes the primary key last
+        return np.lexsort([-view if descending else view for view, (_, descending) in reversed(list(zip(views, keys)))]).tolist()
+    positions = list(range(store.length))
+    for idx, descending in reversed(keys):
+        positions.sort(key=null_key(store.columns[idx]).__getitem__, reverse=descending)
+    return positions
+
+
+def top_rows(rows: Iterable, n: int, keys: list[tuple[int, bool]]) -> list:
+    # bounded heap of n rows, ties keep the input order like a stable sort
+    def row_key(row):
+        return tuple(_Descending((row[idx] is None, row[idx])) if descending else (row[idx] is None, row[idx]) for idx, descending in keys)
+    return heapq.nsmallest(n, rows, key=row_key)
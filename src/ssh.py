@@ -1,5 +1,6 @@
 from paramiko import SSHClient, SFTPClient, AutoAddPolicy 
 from urllib.parse import ParseResult, urlsplit, parse_qsl
+from .compress import TRANSPORT, compression
 
 
 class SSH:
@@ -11,6 +12,7 @@ class SSH:
     password: str
     path: str
     query: dict
+    compress: str
     ssh: SSHClient
     _sftp: SFTPClient = None
 
@@ -26,6 +28,8 @@ class SSH:
         self.password = url.password
         self.path = url.path
         self.query = {item[0].lower(): item[1] for item in parse_qsl(url.query)}
+        # ?compress=ssh for transport compression, gzip / zstd for compressed file streams
+        self.compress = compression(self.query.get("compress"))
         self.ssh = SSHClient()
         self.ssh.set_missing_host_key_policy(AutoAddPolicy())
         self.connect(self.params)
@@ -42,7 +46,7 @@ class SSH:
         return self._sftp
 
     def connect(self, params: dict) -> None:
-        self.ssh.connect(**params, timeout=3)
+        self.ssh.connect(**params, timeout=3, compress=self.compress == TRANSPORT)
 
     def reconnect(self) -> None:
         self.close()
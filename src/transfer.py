@@ -0,0 +1,139 @@
+from collections.abc import Callable, Iterator
+from functools import partial
+from queue import Queue, Empty
+from threading import Event, Thread
+from time import sleep
+from .utils import progress_bar
+from .constants import SYNC_WORKERS, SYNC_RETRIES, SYNC_RETRY_DELAY
+
+LARGEST = "largest"
+SMALLEST = "smallest"
+
+
+def order_files(files: list, sizes: dict, order: str=None) -> list:
+    # largest first keeps the long transfers from trailing at the end
+    if order is None:
+        return list(files)
+    if order not in (LARGEST, SMALLEST):
+        raise ValueError(f"Unknown transfer order '{order}', expected '{LARGEST}' or '{SMALLEST}'.")
+    return sorted(files, key=lambda file: sizes.get(file, 0), reverse=order == LARGEST)
+
+
+def report(progress: bool|Callable, done: int, total: int) -> None:
+    if progress is True:
+        progress_bar(done, total)
+    elif progress:
+        progress(done, total)
+
+
+def retry(func: Callable, retries: int=SYNC_RETRIES, on_error: Callable=None, stop: Event=None):
+    # func() again after a growing delay, on_error runs after every failed attempt
+    for attempt in range(retries + 1):
+        try:
+            return func()
+        except Exception:
+            if on_error:
+                on_error()
+            if attempt == retries or (stop is not None and stop.is_set()):
+                raise
+            sleep(SYNC_RETRY_DELAY * (attempt + 1))
+
+
+def transfer_files(
+    folder_sync,
+    files: list,
+    parse_target: Callable=None,
+    workers: int=1,
+    retries: int=SYNC_RETRIES,
+    progress: bool|Callable=None,
+) -> Iterator[tuple]:
+    """(file, result) pairs of the synced files, in completion order with workers."""
+    if workers > 1:
+        return Transfer(folder_sync, files, parse_target, workers, retries, progress)
+    return sequential(folder_sync, files, parse_target, retries, progress)
+
+
+def sequential(folder_sync, files: list, parse_target: Callable=None, retries: int=SYNC_RETRIES, progress: bool|Callable=None) -> Iterator[tuple]:
+    for done, file in enumerate(files, 1):
+        result = retry(partial(folder_sync.sync_file, file, parse_target), retries)
+        report(progress, done, len(files))
+        yield file, result
+
+
+class Transfer:
+    """Copies the files of a FolderSync on parallel workers.
+
+    Every worker has its own SFTP channels, a failed file is retried on
+    new channels and (file, result) pairs are yielded as the files complete.
+    """
+    total: int
+
+    def __init__(
+        self,
+        folder_sync,
+        files: list,
+        parse_target: Callable=None,
+        workers: int=SYNC_WORKERS,
+        retries: int=SYNC_RETRIES,
+        progress: bool|Callable=None,
+    ) -> None:
+        self.folder_sync = folder_sync
+        self.parse_target = parse_target
+        self.retries = retries
+        self.progress = progress
+        self.total = len(files)
+        self.tasks = Queue()
+        for file in files:
+            self.tasks.put(file)
+        self.results = Queue()
+        self.stop = Event()
+        # daemon threads, an abandoned generator does not block the interpreter exit
+        self.threads = [Thread(target=self.work, daemon=True) for _ in range(max(1, min(workers, self.total)))]
+        for thread in self.threads:
+            thread.start()
+
+    def work(self) -> None:
+        worker = None
+
+        def sync_file(file):
+            nonlocal worker
+            worker = worker or self.folder_sync.channel()
+            return worker.sync_file(file, self.parse_target)
+
+        def reset():
+            # a failed file is retried on new channels
+            nonlocal worker
+            if worker:
+                worker.close()
+                worker = None
+
+        try:
+            while not self.stop.is_set():
+                try:
+                    file = self.tasks.get_nowait()
+                except Empty:
+                    break
+                try:
+                    target_file, _ = retry(partial(sync_file, file), self.retries, reset, self.stop)
+                except Exception as e:
+                    self.results.put(e)
+                    return
+                self.results.put((file, (target_file, self.folder_sync.target)))
+        finally:
+            reset()
+
+    def __iter__(self) -> Iterator[tuple]:
+        try:
+            for done in range(1, self.total + 1):
+                result = self.results.get()
+                if isinstance(result, Exception):
+                    raise result
+                report(self.progress, done, self.total)
+                yield result
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        self.stop.set()
+        for thread in self.threads:
+            thread.join()
@@ -1,6 +1,7 @@
 import os
 import hashlib
-from collections.abc import Sequence
+from collections.abc import Sequence, Iterable
+from itertools import chain, islice
 from uuid import getnode
 from urllib.parse import urlparse, ParseResult
 from datetime import date, datetime, timedelta
@@ -45,6 +46,19 @@ def yield_list(iterable: Sequence, n: int):
     for i in range(0, len(iterable), n):  
         yield iterable[i:i + n]
 
+def iter_chunks(iterable: Iterable, n: int):
+    # lazy chunks of n items, each chunk must be consumed before the next one
+    iterator = iter(iterable)
+    for first in iterator:
+        yield chain((first, ), islice(iterator, n - 1))
+
+def close_all(*resources) -> None:
+    # files, cursors, connections, None is skipped
+    for resource in resources:
+        if resource is not None:
+            resource.close()
+
+
 def file_extension(path: str, lowered: bool=True) -> str:
     ext: str = os.path.splitext(path)[1][1:]
     if lowered:
@@ -0,0 +1,193 @@
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from io import BytesIO
+from math import isfinite
+from xml.sax.saxutils import escape, quoteattr
+from zipfile import ZipFile, ZIP_DEFLATED
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.utils import get_column_letter, quote_sheetname, absolute_coordinate
+from openpyxl.utils.datetime import to_excel
+from openpyxl.workbook.child import INVALID_TITLE_REGEX
+from .columnar import ColumnStore
+
+
+# Minimal SpreadsheetML package, every worker writes one self contained sheet:
+# strings are inline (no shared strings table) and style ids are fixed below.
+NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+XLSX_MAX_COLUMNS = 16384
+XLSX_MAX_TITLE = 31
+LETTERS = [get_column_letter(j) for j in range(1, XLSX_MAX_COLUMNS + 1)]
+
+STYLE_NORMAL = 0
+STYLE_TITLE = 1
+STYLE_HEADER = 2
+STYLE_BODY = 3
+# number formats for date values, (unformatted, formatted) style ids
+STYLE_DATES = {
+    datetime: (4, 5),
+    date: (6, 7),
+    time: (8, 9),
+    timedelta: (8, 9),
+}
+
+STYLES_XML = XML_HEADER + f"""<styleSheet xmlns="{NS_MAIN}">
+<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm:ss"/></numFmts>
+<fonts count="2"><font><sz val="11"/><name val="Calibri"/><family val="2"/></font><font><b/><sz val="12"/><name val="Calibri"/><family val="2"/></font></fonts>
+<fills count="3"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill><fill><patternFill patternType="solid"><fgColor rgb="00D7E4BC"/></patternFill></fill></fills>
+<borders count="2"><border><left/><right/><top/><bottom/><diagonal/></border><border><left style="thin"><color rgb="00000000"/></left><right style="thin"><color rgb="00000000"/></right><top style="thin"><color rgb="00000000"/></top><bottom style="thin"><color rgb="00000000"/></bottom><diagonal/></border></borders>
+<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>
+<cellXfs count="10">
+<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>
+<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>
+<xf numFmtId="0" fontId="1" fillId="2" borderId="1" xfId="0" applyFont="1" applyFill="1" applyBorder="1"/>
+<xf numFmtId="0" fontId="0" fillId="0" borderId="1" xfId="0" applyBorder="1"/>
+<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>
+<xf numFmtId="164" fontId="0" fillId="0" borderId="1" xfId="0" applyNumberFormat="1" applyBorder="1"/>
+<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>
+<xf numFmtId="14" fontId="0" fillId="0" borderId="1" xfId="0" applyNumberFormat="1" applyBorder="1"/>
+<xf numFmtId="21" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>
+<xf numFmtId="21" fontId="0" fillId="0" borderId="1" xfId="0" applyNumberFormat="1" applyBorder="1"/>
+</cellXfs>
+<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>
+</styleSheet>"""
+
+
+def cell_xml(ref: str, value, style: int, formatted: bool) -> str:
+    if value is None:
+        return ""
+    kind = type(value)
+    style = f' s="{style}"' if style else ""
+    if kind is bool:
+        return f'<c r="{ref}" t="b"{style}><v>{int(value)}</v></c>'
+    if kind in (int, float, Decimal):
+        if kind is not int and not (value.is_finite() if kind is Decimal else isfinite(value)):
+            # nan / inf are not numbers in SpreadsheetML, written empty as openpyxl does
+            return ""
+        return f'<c r="{ref}"{style}><v>{value}</v></c>'
+    if kind in STYLE_DATES:
+        return f'<c r="{ref}" s="{STYLE_DATES[kind][formatted]}"><v>{to_excel(value)}</v></c>'
+    text = escape(ILLEGAL_CHARACTERS_RE.sub("", value if kind is str else str(value)))
+    return f'<c r="{ref}" t="inlineStr"{style}><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def check_title(title: str, titles: set=None) -> str:
+    # rules of Excel, checked before any sheet is written, titles: lowered titles already used
+    if not title:
+        raise ValueError("Sheet title must have at least one character.")
+    if len(title) > XLSX_MAX_TITLE:
+        raise ValueError(f"Sheet title '{title}' is longer than {XLSX_MAX_TITLE} characters.")
+    if match := INVALID_TITLE_REGEX.search(title):
+        raise ValueError(f"Invalid character {match.group(0)} in sheet title '{title}'.")
+    if titles is not None:
+        if title.lower() in titles:
+            raise ValueError(f"Duplicate sheet title '{title}', sheet titles are case insensitive.")
+        titles.add(title.lower())
+    return title
+
+
+def row_xml(row_idx: int, row, style: int, formatted: bool) -> str:
+    cells = "".join(cell_xml(f"{LETTERS[j]}{row_idx}", value, style, formatted) for j, value in enumerate(row))
+    return f'<row r="{row_idx}">{cells}</row>'
+
+
+def write_sheet(path: str, columns: list, extra_data: list, data, formatted: bool=True) -> str|None:
+    """Write one worksheet XML file, returns the autofilter range."""
+    rows = data.rows() if isinstance(data, ColumnStore) else data
+    fields_row = len(extra_data) + 1
+    body_path = f"{path}.rows"
+    values_len = [0] * len(columns)
+    row_idx = fields_row
+    with open(body_path, "w", encoding="utf-8") as body:
+        for row_idx, row in enumerate(rows, start=fields_row + 1):
+            body.write(row_xml(row_idx, row, STYLE_BODY if formatted else STYLE_NORMAL, formatted))
+            if formatted:
+                values_len = [max(current, len(f"{value}")) for current, value in zip(values_len, row)]
+    last_cell = f"{LETTERS[max(len(columns), 1) - 1]}{row_idx}"
+    auto_filter = f"A{fields_row}:{last_cell}" if formatted else None
+    with open(path, "w", encoding="utf-8") as sheet:
+        sheet.write(f'{XML_HEADER}<worksheet xmlns="{NS_MAIN}" xmlns:r="{NS_REL}">')
+        sheet.write(f'<dimension ref="A1:{last_cell}"/>')
+        if formatted:
+            sheet.write(f'<sheetViews><sheetView workbookViewId="0"><pane ySplit="{fields_row}" topLeftCell="A{fields_row + 1}" activePane="bottomLeft" state="frozen"/><selection pane="bottomLeft"/></sheetView></sheetViews>')
+            sheet.write("<cols>")
+            for j, (column, maxvalue_len) in enumerate(zip(columns, values_len), start=1):
+                fieldname_len = len(f"{column}")
+                length = (max(fieldname_len, maxvalue_len) + (4.23 if fieldname_len >= maxvalue_len - 1 else 1.23)) * 1.23
+                sheet.write(f'<col min="{j}" max="{j}" width="{length}" customWidth="1"/>')
+            sheet.write("</cols>")
+        sheet.write("<sheetData>")
+        for i, row in enumerate(extra_data, start=1):
+            sheet.write(row_xml(i, row, STYLE_TITLE if formatted else STYLE_NORMAL, formatted))
+        sheet.write(row_xml(fields_row, columns, STYLE_HEADER if formatted else STYLE_NORMAL, formatted))
+        with open(body_path, encoding="utf-8") as body:
+            shutil.copyfileobj(body, sheet)
+        sheet.write("</sheetData>")
+        if auto_filter:
+            sheet.write(f'<autoFilter ref="{auto_filter}"/>')
+        sheet.write("</worksheet>")
+    os.remove(body_path)
+    return auto_filter
+
+
+def write_workbook(file_name, sheets: list[tuple[str, str, str|None]], stream: bool=False) -> str|BytesIO:
+    # sheets: [(title, sheet xml path, autofilter range), ...]
+    target = BytesIO() if stream else file_name
+    sheet_items = "".join(f'<sheet name={quoteattr(title)} sheetId="{i}" r:id="rId{i}"/>' for i, (title, _, _) in enumerate(sheets, start=1))
+    defined_names = "".join(
+        f'<definedName name="_xlnm._FilterDatabase" localSheetId="{i}" hidden="1">{escape(quote_sheetname(title))}!{absolute_coordinate(auto_filter)}</definedName>'
+        for i, (title, _, auto_filter) in enumerate(sheets) if auto_filter
+    )
+    with ZipFile(target, "w", ZIP_DEFLATED, compresslevel=1) as zf:
+        zf.writestr("[Content_Types].xml", XML_HEADER
+            + '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            + '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            + '<Default Extension="xml" ContentType="application/xml"/>'
+            + '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            + '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            + "".join(f'<Override PartName="/xl/worksheets/sheet{i}.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>' for i in range(1, len(sheets) + 1))
+            + "</Types>")
+        zf.writestr("_rels/.rels", f'{XML_HEADER}<Relationships xmlns="{NS_PKG_REL}"><Relationship Id="rId1" Type="{NS_REL}/officeDocument" Target="xl/workbook.xml"/></Relationships>')
+        zf.writestr("xl/workbook.xml", f'{XML_HEADER}<workbook xmlns="{NS_MAIN}" xmlns:r="{NS_REL}"><sheets>{sheet_items}</sheets>{f"<definedNames>{defined_names}</definedNames>" if defined_names else ""}</workbook>')
+        zf.writestr("xl/_rels/workbook.xml.rels", XML_HEADER + f'<Relationships xmlns="{NS_PKG_REL}">'
+            + "".join(f'<Relationship Id="rId{i}" Type="{NS_REL}/worksheet" Target="worksheets/sheet{i}.xml"/>' for i in range(1, len(sheets) + 1))
+            + f'<Relationship Id="rId{len(sheets) + 1}" Type="{NS_REL}/styles" Target="styles.xml"/></Relationships>')
+        zf.writestr("xl/styles.xml", STYLES_XML)
+        for i, (_, path, _) in enumerate(sheets, start=1):
+            zf.write(path, f"xl/worksheets/sheet{i}.xml")
+    if stream:
+        target.seek(0)
+        target.name = file_name
+    return target
+
+
+def write_sheets(file_name, sheets, formatted: bool=True, stream: bool=False, processes: int|bool=True) -> str|BytesIO:
+    """Build every sheet XML in a process pool and assemble the xlsx package.
+
+    sheets: iterable of (title, columns, extra_data, data) in workbook order.
+    """
+    workers = os.cpu_count() if processes is True else int(processes)
+    temp_dir = tempfile.mkdtemp(prefix="xlsx_")
+    titles, futures, used = [], [], set()
+    try:
+        with ProcessPoolExecutor(workers) as executor:
+            for title, columns, extra_data, data in sheets:
+                check_title(title, used)
+                # bound the number of sheets waiting for a worker
+                pending = [future for future in futures if not future.done()]
+                if len(pending) >= workers * 2:
+                    wait(pending, return_when=FIRST_COMPLETED)
+                path = os.path.join(temp_dir, f"sheet{len(futures) + 1}.xml")
+                futures.append(executor.submit(write_sheet, path, columns, extra_data, data, formatted))
+                titles.append((title, path))
+            auto_filters = [future.result() for future in futures]
+        return write_workbook(file_name, [(title, path, auto_filter) for (title, path), auto_filter in zip(titles, auto_filters)], stream)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
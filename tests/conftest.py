@@ -0,0 +1,13 @@
+import importlib.util
+import os
+import sys
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+# database.py imports constants as a top level module
+sys.path.insert(0, SRC)
+if "unidata" not in sys.modules:
+    spec = importlib.util.spec_from_file_location("unidata", os.path.join(SRC, "__init__.py"), submodule_search_locations=[SRC])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["unidata"] = module
+    spec.loader.exec_module(module)
@@ -0,0 +1,74 @@
+import io
+import os
+import random
+import subprocess
+import sys
+import pytest
+from unidata.delta import COPY, DATA, PATCH_SCRIPT, block_size, delta, encode, parse_signatures, signatures
+
+SIZE = 1024
+
+
+def patch(base: bytes, instructions) -> bytes:
+    # same rebuild as the remote patch script
+    out = bytearray()
+    for kind, value in instructions:
+        out += base[value * SIZE:(value + 1) * SIZE] if kind == COPY else value
+    return bytes(out)
+
+
+def instructions(base: bytes, new: bytes) -> list:
+    return list(delta(io.BytesIO(new), signatures(io.BytesIO(base), SIZE), SIZE))
+
+
+@pytest.fixture(scope="module")
+def base() -> bytes:
+    return random.Random(0).randbytes(SIZE * 50 + 123)
+
+
+@pytest.mark.parametrize("change", ["same", "insert", "delete", "modify", "append", "truncate", "empty"])
+def test_round_trip(base, change):
+    new = {
+        "same": base,
+        "insert": base[:5000] + b"inserted" * 100 + base[5000:],
+        "delete": base[:7000] + base[9500:],
+        "modify": base[:20000] + b"X" * 10 + base[20010:],
+        "append": base + b"tail",
+        "truncate": base[:SIZE * 20 + 17],
+        "empty": b"",
+    }[change]
+    result = instructions(base, new)
+    assert patch(base, result) == new
+    if change == "empty":
+        assert result == []
+    else:
+        # unchanged blocks are copied, not sent again
+        literal = sum(len(value) for kind, value in result if kind == DATA)
+        assert literal <= abs(len(new) - len(base)) + 3 * SIZE
+
+
+def test_empty_base():
+    new = b"new file"
+    assert patch(b"", instructions(b"", new)) == new
+
+
+def test_signatures_encoding(base):
+    signed = signatures(io.BytesIO(base), SIZE)
+    data = b"".join(weak.to_bytes(4, "big") + strong for weak, strong in signed)
+    assert parse_signatures(data) == signed
+    assert len(signed) == -(-len(base) // SIZE)
+
+
+def test_block_size():
+    assert block_size(0) == block_size(1024) > 0
+    assert block_size(10 ** 12) >= block_size(10 ** 9) >= block_size(10 ** 6)
+
+
+def test_patch_script(tmp_path, base):
+    path = tmp_path / "file.bin"
+    path.write_bytes(base)
+    new = base[:3000] + b"changed" + base[4000:] + b"end"
+    stream = b"".join(encode(instructions(base, new)))
+    subprocess.run([sys.executable, "-c", PATCH_SCRIPT, str(path), str(SIZE)], input=stream, check=True)
+    assert path.read_bytes() == new
+    assert not os.path.exists(f"{path}.delta")
@@ -0,0 +1,60 @@
+import pytest
+from unidata.dataset import Dataset
+
+ROWS = [[i, str(i), i * 1.5, "x"] for i in range(25)]
+COLUMNS = ["a", "b", "c", "d"]
+
+
+def transforms(dataset: Dataset) -> Dataset:
+    dataset.convert(str, "a").remove("d").rename_columns({"b": "bb"})
+    dataset.append_default_values({"k": 7, "a": 0})
+    dataset.auto_increment("c", 100)
+    dataset.convert(float, "k")
+    return dataset
+
+
+@pytest.fixture
+def eager() -> Dataset:
+    return transforms(Dataset([list(row) for row in ROWS], COLUMNS))
+
+
+@pytest.fixture
+def csv_file(tmp_path) -> str:
+    file_name = str(tmp_path / "rows.csv")
+    Dataset([list(row) for row in ROWS], COLUMNS).to_csv(file_name)
+    return file_name
+
+
+def test_lazy_matches_eager(eager):
+    lazy = transforms(Dataset([list(row) for row in ROWS], COLUMNS).lazy())
+    assert lazy.is_lazy
+    assert lazy.columns == eager.columns
+    assert list(lazy.iterrows()) == list(eager.iterrows())
+    # an in-memory source keeps its plan and can be read again
+    assert list(lazy.iterrows()) == list(eager.iterrows())
+    lazy.collect()
+    assert not lazy.is_lazy
+    assert [list(row) for row in lazy.data] == [list(row) for row in eager.data]
+
+
+def test_lazy_selection(eager):
+    lazy = transforms(Dataset([list(row) for row in ROWS], COLUMNS).lazy())
+    selected = lazy[["k", "c"]]
+    assert selected.columns == ["k", "c"]
+    assert list(selected.iterrows()) == list(eager[["k", "c"]].iterrows())
+
+
+@pytest.mark.parametrize("batch_size", [1, 4, 25, 100])
+def test_lazy_stream(csv_file, batch_size):
+    eager = transforms(Dataset().from_csv(csv_file, types=True))
+    lazy = transforms(Dataset().from_csv(csv_file, stream=True, batch_size=batch_size, types=True).lazy())
+    assert list(lazy.iterrows()) == list(eager.iterrows())
+    # row numbers continue across batches
+    assert [row[eager.columns.index("c")] for row in eager.iterrows()] == list(range(100, 100 + len(ROWS)))
+
+
+def test_lazy_stream_consumed(csv_file):
+    lazy = transforms(Dataset().from_csv(csv_file, stream=True, batch_size=4).lazy())
+    list(lazy.iterrows())
+    with pytest.raises(RuntimeError):
+        lazy.data
@@ -0,0 +1,104 @@
+import sqlite3
+import sys
+import threading
+import time
+import types
+import pytest
+from unidata.pool import ConnectionPool, POOLS, close_pools, get_database
+
+
+@pytest.fixture
+def url(tmp_path, monkeypatch):
+    # DB-API driver over sqlite3, connections are shared between threads
+    driver = types.ModuleType("pooltestdb")
+    driver.paramstyle = "qmark"
+    driver.connect = lambda host=None, database=None, **kwargs: sqlite3.connect(f"/{database}", check_same_thread=False)
+    monkeypatch.setitem(sys.modules, driver.__name__, driver)
+    yield f"sqlite+pooltestdb://localhost{tmp_path / 'pool.db'}"
+    close_pools()
+
+
+def test_checkout_return(url):
+    with ConnectionPool(url, max_size=2) as pool:
+        a = pool.acquire()
+        b = pool.acquire()
+        assert a is not b and pool.size == 2 and pool.idle == 0
+        a.close()
+        # a second close is not a second release
+        a.close()
+        assert pool.idle == 1
+        assert pool.acquire() is a
+        a.close()
+        b.close()
+        assert pool.size == 2 and pool.idle == 2
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+
+
+def test_timeout(url):
+    with ConnectionPool(url, max_size=1, timeout=0.1) as pool:
+        database = pool.acquire()
+        with pytest.raises(TimeoutError):
+            pool.acquire()
+        database.close()
+        pool.acquire().close()
+
+
+def test_idle_timeout(url):
+    with ConnectionPool(url, min_size=1, max_size=3, idle_timeout=0.05) as pool:
+        databases = [pool.acquire() for _ in range(3)]
+        for database in databases:
+            database.close()
+        assert pool.size == 3
+        time.sleep(0.1)
+        pool.acquire().close()
+        assert pool.size == 1
+
+
+def test_threads(url):
+    max_size, workers, rounds = 3, 12, 20
+    pool = ConnectionPool(url, max_size=max_size, timeout=10)
+    lock = threading.Lock()
+    active, peak, errors = set(), [0], []
+
+    def work():
+        try:
+            for _ in range(rounds):
+                database = pool.acquire()
+                with lock:
+                    # a connection is checked out by one thread at a time
+                    assert id(database) not in active
+                    active.add(id(database))
+                    peak[0] = max(peak[0], len(active))
+                database.execute("SELECT 1")
+                time.sleep(0.001)
+                with lock:
+                    active.discard(id(database))
+                database.close()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=work) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert peak[0] <= max_size and pool.size <= max_size
+    assert pool.idle == pool.size
+    pool.close()
+    assert pool.size == 0
+
+
+def test_get_database(url):
+    pooled = f"{url}?pool=1&pool_max=2"
+    database = get_database(pooled)
+    pool = POOLS[pooled]
+    assert database.pool is pool and pool.max_size == 2
+    database.close()
+    with get_database(pooled) as database:
+        assert database.pool is pool
+    assert pool.idle == 1
+    database = get_database(url)
+    assert database.pool is None
+    database.close()